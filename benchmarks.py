@@ -0,0 +1,381 @@
+"""Pruebas de carga y benchmarks de NM Controller.
+
+Uso: python benchmarks.py <benchmark> [opciones]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def bench_ui_stress(args) -> bool:
+    """Inunda la ruta de ingesta de estados y comprueba que no se pierde nada.
+
+    Un hilo productor escribe estados numerados para ``--devices`` dispositivos,
+    a ``--rate`` paquetes por segundo, mientras la interfaz los aplica con su
+    temporizador. Al terminar, cada dispositivo debe mostrar el último número
+    enviado y ningún refresco debe superar ``--max-latency-ms``.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QTimer
+    from main import NMController
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    # Sin persistencia ni puertos UDP: no toca ~/.nmcontroller ni choca con la app
+    window = NMController(persist=False, listen=False)
+
+    ips = [f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}" for i in range(args.devices)]
+    for ip in ips:
+        window.handle_config_received({'IP': ip, 'BoardType': 'bench'})
+
+    latencies = []
+    flush = window.flush_pending_updates
+
+    def timed_flush():
+        start = time.perf_counter()
+        flush()
+        latencies.append(time.perf_counter() - start)
+
+    window.flush_timer.timeout.disconnect()
+    window.flush_timer.timeout.connect(timed_flush)
+
+    sent = [0]
+
+    def produce():
+        start = time.monotonic()
+        round_time = len(ips) / args.rate
+        seq = 0
+        while time.monotonic() - start < args.seconds:
+            seq += 1
+            for ip in ips:
+                window.pending_updates.push(ip, {'Valid': seq, 'HashRate': f"{seq}K"})
+            delay = start + seq * round_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        sent[0] = seq
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+
+    def finish():
+        if producer.is_alive():
+            return
+        timed_flush()
+        app.quit()
+
+    poll = QTimer()
+    poll.timeout.connect(finish)
+    poll.start(50)
+    app.exec()
+
+    lost = [ip for ip in ips if window.devices.get(ip).valid != sent[0]]
+    max_latency_ms = max(latencies) * 1000 if latencies else 0.0
+    print(f"devices={args.devices} rounds={sent[0]} packets={sent[0] * args.devices} "
+          f"flushes={len(latencies)} max_flush={max_latency_ms:.2f} ms lost={len(lost)}")
+    return not lost and max_latency_ms <= args.max_latency_ms
+
+
+def bench_startup(args) -> bool:
+    """Mide el tiempo hasta el primer pintado de la ventana principal.
+
+    Lanza ``main.py --startup-benchmark`` ``--runs`` veces y muestra la mediana
+    del tiempo medido dentro del proceso (desde el primer import hasta el
+    primer evento de pintado) y del tiempo total del proceso. Cada arranque
+    usa un directorio de datos temporal vacío y no abre los puertos UDP.
+    """
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    first_paint, wall = [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as data_dir:
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, script, '--startup-benchmark',
+                                     '--data-dir', data_dir, '--no-listen'],
+                                    capture_output=True, text=True, env=env, timeout=60)
+            wall.append((time.perf_counter() - start) * 1000)
+        for line in result.stdout.splitlines():
+            if line.startswith('first_paint_ms='):
+                first_paint.append(float(line.split('=')[1]))
+    if not first_paint:
+        print("main.py did not report a first paint")
+        return False
+    print(f"runs={len(first_paint)} first_paint={statistics.median(first_paint):.1f} ms "
+          f"process={statistics.median(wall):.1f} ms")
+    return True
+
+
+SAMPLE_STATUS = {
+    'HashRate': '1021.46KH/s', 'Share': '1204/3/99.75%', 'NetDiff': '110.57T',
+    'PoolDiff': '0.0010', 'LastDiff': '1.23K', 'BestDiff': '3.51M', 'Valid': 0,
+    'Progress': 0.12, 'Temp': 45.6, 'RSSI': -61, 'FreeHeap': 170.1,
+    'Uptime': '002d 13:14:15', 'Version': 'v1.5.2', 'BoardType': 'NMMiner',
+    'PoolInUse': 'public-pool.io:21496',
+}
+
+
+def bench_parse(args) -> bool:
+    """Mide el coste por paquete del parseo numérico y del upsert completo."""
+    from nm_device import DeviceRegistry, STATUS_FIELDS
+    from nm_parse import PARSED_FIELDS
+
+    iterations = args.iterations
+    raw = [(STATUS_FIELDS[key], value) for key, value in SAMPLE_STATUS.items()
+           if STATUS_FIELDS[key] in PARSED_FIELDS]
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for field, value in raw:
+            PARSED_FIELDS[field](value)
+    parse_us = (time.perf_counter() - start) / iterations * 1e6
+
+    # Cada paquete cambia todos los campos para forzar el parseo en el upsert
+    registry = DeviceRegistry()
+    statuses = [dict(SAMPLE_STATUS, HashRate=f"{i % 1000}.5KH/s", Share=f"{i}/0",
+                     Uptime=f"0d 00:00:{i % 60:02d}", BestDiff=f"{i}K")
+                for i in range(1000)]
+    start = time.perf_counter()
+    for i in range(iterations):
+        registry.upsert('10.0.0.1', statuses[i % 1000])
+    upsert_us = (time.perf_counter() - start) / iterations * 1e6
+    print(f"packets={iterations} parse={parse_us:.2f} us/packet upsert={upsert_us:.2f} us/packet")
+    return True
+
+
+def _fleet_statuses(count: int) -> list:
+    """Paquetes JSON decodificados y distintos para ``count`` dispositivos."""
+    return [json.loads(json.dumps(dict(
+        SAMPLE_STATUS, HashRate=f"{i % 1000}.{i % 100:02d}KH/s", Share=f"{i}/{i % 7}/99.5%",
+        BestDiff=f"{i % 500}.5M", Uptime=f"{i % 30:03d}d 01:02:{i % 60:02d}",
+        Temp=40 + i % 30 + 0.5, RSSI=-40 - i % 50, FreeHeap=150 + i % 40 + 0.25, Valid=i)))
+        for i in range(count)]
+
+
+# Memoria máxima del registro respecto a la representación original
+MEMORY_RATIO_LIMIT = 0.9
+
+
+def bench_memory(args) -> bool:
+    """Compara memoria y coste de los agregados con la representación original.
+
+    Aplica un paquete por dispositivo a ``--devices`` dispositivos con
+    ``DeviceRegistry`` (dataclass con ``__slots__`` y textos y números en
+    columnas NumPy) y con una dataclass con ``__dict__`` que guarda los textos
+    tal cual llegan, como el ``NetworkDevice`` original. Mide con
+    ``tracemalloc`` lo que ocupa cada flota y el tiempo de sumar el hash rate
+    de los dispositivos online. Falla si el registro no ocupa como mucho
+    ``MEMORY_RATIO_LIMIT`` veces lo que la representación original.
+    """
+    import dataclasses
+    import tracemalloc
+    from nm_device import DeviceRegistry, STATUS_FIELDS
+    from nm_parse import parse_hash_rate
+
+    legacy_class = dataclasses.make_dataclass('LegacyNetworkDevice', [
+        ('ip', str), ('port', int), ('device_id', str), ('is_online', bool)] + [
+        (name, type(default), dataclasses.field(default=default)) for name, default in (
+            ('hash_rate', "0"), ('share', "0/0"), ('net_diff', "0"), ('pool_diff', "0"),
+            ('last_diff', "0"), ('best_diff', "0"), ('valid', 0), ('progress', 0.0),
+            ('temp', 0.0), ('rssi', 0.0), ('free_heap', 0.0), ('uptime', "0"),
+            ('version', ""), ('board_type', ""), ('pool_in_use', ""), ('update_time', ""))])
+    ips = [f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}" for i in range(args.devices)]
+
+    def build_legacy():
+        devices = []
+        for ip, status in zip(ips, _fleet_statuses(args.devices)):
+            device = legacy_class(ip, 12345, status['BoardType'], True)
+            for key, field in STATUS_FIELDS.items():
+                setattr(device, field, status[key])
+            device.update_time = time.strftime("%Y-%m-%d %H:%M:%S")
+            devices.append(device)
+        return devices
+
+    def build_registry():
+        registry = DeviceRegistry()
+        for ip, status in zip(ips, _fleet_statuses(args.devices)):
+            registry.upsert(ip, status)
+        return registry
+
+    results = {}
+    for name, build in (('legacy', build_legacy), ('registry', build_registry)):
+        tracemalloc.start()
+        fleet = build()
+        size = tracemalloc.get_traced_memory()[0]
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        results[name] = (fleet, size, snapshot)
+
+    legacy, legacy_bytes, _ = results['legacy']
+    registry, registry_bytes, snapshot = results['registry']
+    # Parte del registro que no es el dispositivo en sí: agregados de la flota
+    stats_bytes = sum(stat.size for stat in snapshot.filter_traces(
+        [tracemalloc.Filter(True, '*fleet_stats.py')]).statistics('filename'))
+    start = time.perf_counter()
+    legacy_total = sum(parse_hash_rate(d.hash_rate) for d in legacy if d.is_online)
+    legacy_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    registry_total = registry.columns.total('hash_rate_hs')
+    registry_ms = (time.perf_counter() - start) * 1000
+    print(f"devices={args.devices} legacy={legacy_bytes / 1024:.0f} KiB "
+          f"({legacy_bytes / args.devices:.0f} B/device) "
+          f"registry={registry_bytes / 1024:.0f} KiB "
+          f"({registry_bytes / args.devices:.0f} B/device, "
+          f"{stats_bytes / args.devices:.0f} B/device of fleet aggregates, "
+          f"columns {registry.columns.nbytes / 1024:.0f} KiB) "
+          f"ratio={registry_bytes / legacy_bytes:.2f}")
+    print(f"total hash rate: legacy={legacy_ms:.2f} ms registry={registry_ms:.3f} ms")
+    if registry_bytes > MEMORY_RATIO_LIMIT * legacy_bytes:
+        print(f"registry uses more than {MEMORY_RATIO_LIMIT:.2f}x the legacy memory")
+        return False
+    return abs(legacy_total - registry_total) <= 1e-6 * max(legacy_total, 1.0)
+
+
+def bench_discovery(args) -> bool:
+    """Comprueba el descubrimiento cuando el primer mensaje tarda en llegar.
+
+    Un hilo envía el estado de un dispositivo a los ``--delay`` segundos y el
+    de otro poco después. La búsqueda debe encontrar los dos (el periodo de
+    silencio no cuenta hasta el primer dispositivo) y terminar un
+    ``--quiet`` después del último, sin esperar al timeout.
+    """
+    from nm_device import NMDevice
+
+    port = _free_port()
+    payload = json.dumps(SAMPLE_STATUS).encode()
+
+    def broadcast():
+        time.sleep(args.delay)
+        # Dos orígenes distintos hacen de dos dispositivos
+        for address in ('127.0.0.1', '127.0.0.2'):
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.bind((address, 0))
+                sock.sendto(payload, ('127.0.0.1', port))
+            time.sleep(0.1)
+
+    threading.Thread(target=broadcast, daemon=True).start()
+    timeout = args.delay + 10 * args.quiet + 1.0
+    start = time.monotonic()
+    devices = NMDevice.discover_network_devices(quiet_period=args.quiet, timeout=timeout,
+                                                port=port)
+    elapsed = time.monotonic() - start
+    print(f"first_broadcast={args.delay:.1f} s quiet={args.quiet:.1f} s "
+          f"found={len(devices)} elapsed={elapsed:.2f} s")
+    return len(devices) == 2 and elapsed < timeout
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _blast(port: int, payload: bytes, seconds: float, target: str, first: int,
+           sockets: int = 32):
+    """Envía ``payload`` sin pausa desde ``sockets`` IP de origen distintas."""
+    # Cada socket hace de un dispositivo (127.0.0.x): SO_REUSEPORT reparte el
+    # unicast por origen y los trabajadores se reparten los broadcast por IP
+    senders = []
+    for i in range(sockets):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.bind((f"127.0.{(first + i) // 250}.{(first + i) % 250 + 2}", 0))
+        senders.append(sock)
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for sock in senders:
+            try:
+                sock.sendto(payload, (target, port))
+            except OSError:
+                pass
+
+
+def bench_ingest(args) -> bool:
+    """Compara los estados/s aplicados al registro con 1 hilo y con N procesos.
+
+    Varios procesos emisores envían estados por UDP durante ``--seconds``,
+    primero unicast a ``127.0.0.1`` y luego broadcast a ``127.255.255.255``
+    (el patrón real de los mineros). Se mide con ``UDPListener`` y con
+    ``ShardedListener`` para 1, 2, 4... hasta ``--workers`` procesos, con la
+    fusión por IP desactivada para que cada paquete sea un ``upsert`` en el
+    proceso principal. Se informa de los upserts por segundo, no de los
+    datagramas leídos.
+    """
+    from nm_device import DeviceRegistry
+    from nm_listener import UDPListener
+    from sharded_ingest import ShardedListener, SHARDING_SUPPORTED
+
+    payload = json.dumps(SAMPLE_STATUS).encode()
+    counts = [0]
+    if SHARDING_SUPPORTED:
+        counts += [n for n in (1, 2, 4, 8, 16, 32) if n <= args.workers]
+    else:
+        print("SO_REUSEPORT sharding not supported on this platform")
+    senders = max(2, os.cpu_count() or 1)
+    print(f"cpus={os.cpu_count()} senders={senders}")
+    for traffic, target in (('unicast', '127.0.0.1'), ('broadcast', '127.255.255.255')):
+        for workers in counts:
+            registry = DeviceRegistry()
+            applied = [0]
+
+            def on_status(ip, status):
+                registry.upsert(ip, status)
+                applied[0] += 1
+
+            options = {'workers': workers, 'coalesce': False} if workers else {}
+            listener_class = ShardedListener if workers else UDPListener
+            listener = listener_class(on_status, lambda config, addr: None, host='0.0.0.0',
+                                      status_port=_free_port(), config_port=_free_port(),
+                                      **options)
+            listener.start()
+            blasters = [multiprocessing.Process(
+                target=_blast, args=(listener.status_port, payload, args.seconds, target, i * 32))
+                for i in range(senders)]
+            for blaster in blasters:
+                blaster.start()
+            for blaster in blasters:
+                blaster.join()
+            time.sleep(0.3)  # Dejar que se vacíen los lotes en vuelo
+            listener.stop()
+            name = f"{workers} process{'es' if workers > 1 else ''}" if workers else "single thread"
+            print(f"{traffic} {name}: {applied[0] / args.seconds:,.0f} upserts/s "
+                  f"(received {listener.received / args.seconds:,.0f} datagrams/s)")
+    return True
+
+
+BENCHMARKS = {
+    'discovery': bench_discovery,
+    'ingest': bench_ingest,
+    'memory': bench_memory,
+    'parse': bench_parse,
+    'startup': bench_startup,
+    'ui-stress': bench_ui_stress,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NM Controller benchmarks")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--devices', type=int, default=300)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--rate', type=float, default=20000.0)
+    parser.add_argument('--max-latency-ms', type=float, default=100.0)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--delay', type=float, default=2.0,
+                        help="Seconds before the first device broadcast (discovery)")
+    parser.add_argument('--quiet', type=float, default=0.5,
+                        help="Discovery quiet period in seconds")
+    args = parser.parse_args()
+    sys.exit(0 if BENCHMARKS[args.benchmark](args) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from nm_device import NMDevice, NetworkDevice
+from tcp_sessions import SessionPool
+
+logger = logging.getLogger('bulk_commands')
+
+# Acciones disponibles: nombre -> función que la ejecuta sobre un NMDevice
+ACTIONS = {
+    'start': lambda device: device.start_mining(),
+    'stop': lambda device: device.stop_mining(),
+    'fan': lambda device, speed: device.set_fan_speed(speed),
+    'reboot': lambda device: device.reboot(),
+}
+
+
+@dataclass
+class CommandResult:
+    ip: str
+    success: bool
+    attempts: int
+    elapsed: float
+    error: Optional[str] = None
+
+
+class BulkExecutor:
+    """Ejecuta una acción sobre muchos dispositivos de red a la vez.
+
+    Como mucho ``max_workers`` dispositivos se atienden en paralelo; cada envío
+    tiene un timeout propio y se reintenta hasta ``retries`` veces. Las
+    conexiones TCP se mantienen en un pool propio, así que repetir una acción
+    sobre la misma flota no vuelve a conectar. ``on_progress(ip, estado,
+    mensaje)`` se llama desde los hilos del pool.
+    """
+
+    def __init__(self, max_workers: int = 64, timeout: float = 2.0, retries: int = 2,
+                 retry_delay: float = 0.5, tcp_pool: SessionPool = None):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.tcp_pool = tcp_pool or SessionPool(timeout=timeout)
+
+    def run(self, devices: List[NetworkDevice], action: str, *args,
+            on_progress: Optional[Callable[[str, str, str], None]] = None
+            ) -> List[CommandResult]:
+        """Ejecuta ``action`` en todos los ``devices`` y devuelve un resultado por cada uno."""
+        command = ACTIONS[action]
+        progress = on_progress or (lambda ip, state, message: None)
+        if not devices:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(devices)))) as pool:
+            return list(pool.map(lambda device: self._run_one(device, command, args, progress),
+                                 devices))
+
+    def close(self):
+        self.tcp_pool.close_all()
+
+    def _run_one(self, device: NetworkDevice, command, args, progress) -> CommandResult:
+        start = time.monotonic()
+        target = NMDevice(network_device=device, tcp_pool=self.tcp_pool)
+        error = None
+        for attempt in range(1, self.retries + 2):
+            progress(device.ip, "sending", f"attempt {attempt}" if attempt > 1 else "")
+            try:
+                if command(target, *args):
+                    progress(device.ip, "done", "")
+                    return CommandResult(device.ip, True, attempt, time.monotonic() - start)
+                error = target.last_error or "command not sent"
+            except Exception as e:
+                error = str(e)
+            if attempt <= self.retries:
+                time.sleep(self.retry_delay * attempt)
+        logger.warning("Command failed on %s: %s", device.ip, error)
+        progress(device.ip, "failed", error)
+        return CommandResult(device.ip, False, self.retries + 1, time.monotonic() - start, error)
@@ -0,0 +1,178 @@
+import json
+import heapq
+import socket
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger('config_push')
+
+CONFIG_PUSH_PORT = 12347
+BROADCAST_IP = "0.0.0.0"
+
+# Campos que el dispositivo acepta por CONFIG_PUSH_PORT (los que envía
+# ConfigWindow) con el valor que usa la ventana cuando el eco no los trae
+CONFIG_DEFAULTS = {
+    "WiFiSSID": "",
+    "WiFiPWD": "",
+    "PrimaryPool": "",
+    "PrimaryPassword": "",
+    "PrimaryAddress": "",
+    "SecondaryPool": "",
+    "SecondaryPassword": "",
+    "SecondaryAddress": "",
+    "Timezone": 8,
+    "UIRefresh": 2,
+    "ScreenTimeout": 60,
+    "Brightness": 100,
+    "SaveUptime": True,
+    "LedEnable": True,
+    "RotateScreen": False,
+    "BTCPrice": False,
+    "AutoBrightness": True,
+}
+
+
+@dataclass
+class ConfigPush:
+    """Un envío en curso; ``done`` se activa cuando ``state`` es definitivo.
+
+    ``expected`` son los campos que el eco debe confirmar (por defecto, los
+    enviados).
+    """
+    ip: str
+    config: dict
+    data: bytes
+    expected: Optional[dict] = None
+    attempts: int = 0
+    delay: float = 0.0
+    done: threading.Event = field(default_factory=threading.Event)
+    state: str = "pending"
+
+
+def config_matches(sent: dict, echo: dict) -> bool:
+    """True si el eco del dispositivo contiene los valores enviados."""
+    common = [key for key in sent if key != 'IP' and key in echo]
+    return bool(common) and all(sent[key] == echo[key] for key in common)
+
+
+class ConfigPusher:
+    """Envía configuraciones por UDP y espera a que el dispositivo las confirme.
+
+    Cada configuración se envía una vez; si el eco del puerto 12346 no llega
+    con los mismos valores, se reenvía con espera exponencial hasta
+    ``max_attempts`` veces. El resultado se comunica con
+    ``on_result(ip, estado, intentos)``, donde el estado es ``confirmed``,
+    ``failed`` o, para un broadcast (que no se puede confirmar), ``sent``.
+    ``on_result`` se llama desde el hilo del emisor.
+    """
+
+    def __init__(self, on_result: Optional[Callable[[str, str, int], None]] = None,
+                 max_attempts: int = 5, initial_delay: float = 0.5, max_delay: float = 4.0,
+                 port: int = CONFIG_PUSH_PORT):
+        self.on_result = on_result
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.port = port
+        self._pending: Dict[str, ConfigPush] = {}
+        self._deadlines = []  # heap de (instante, secuencia, envío)
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._sock = None
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._sock:
+            self._sock.close()
+
+    def push(self, ip: str, config: dict, expected: Optional[dict] = None) -> ConfigPush:
+        """Programa el envío de ``config`` a ``ip``; no bloquea.
+
+        Solo se comprueban en el eco los campos de ``expected`` (o, sin él,
+        los de ``config``). Una configuración nueva para la misma IP sustituye
+        a la pendiente.
+        """
+        push = ConfigPush(ip, config, json.dumps(config).encode('utf-8'), expected)
+        with self._cond:
+            previous = self._pending.get(ip)
+            self._pending[ip] = push
+            self._schedule(push, time.monotonic())
+        if previous:
+            previous.state = "superseded"
+            previous.done.set()
+        return push
+
+    def acknowledge(self, config: dict) -> bool:
+        """Comprueba un eco de configuración recibido; True si confirma un envío."""
+        ip = config.get('IP')
+        with self._cond:
+            push = self._pending.get(ip)
+            if push is None or push.attempts == 0 or \
+                    not config_matches(push.expected or push.config, config):
+                return False
+            del self._pending[ip]
+        self._finish(push, "confirmed")
+        return True
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _schedule(self, push: ConfigPush, when: float):
+        self._sequence += 1
+        heapq.heappush(self._deadlines, (when, self._sequence, push))
+        self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    now = time.monotonic()
+                    if self._deadlines and self._deadlines[0][0] <= now:
+                        break
+                    wait = self._deadlines[0][0] - now if self._deadlines else None
+                    self._cond.wait(wait)
+                if not self._running:
+                    return
+                _, _, push = heapq.heappop(self._deadlines)
+                if self._pending.get(push.ip) is not push:
+                    continue  # ya confirmado o sustituido
+                if push.attempts >= self.max_attempts:
+                    del self._pending[push.ip]
+                    expired = push
+                else:
+                    expired = None
+                    push.attempts += 1
+                    push.delay = min(self.max_delay, push.delay * 2 or self.initial_delay)
+                    self._schedule(push, time.monotonic() + push.delay)
+            if expired:
+                self._finish(expired, "sent" if expired.ip == BROADCAST_IP else "failed")
+                continue
+            target = '<broadcast>' if push.ip == BROADCAST_IP else push.ip
+            try:
+                self._sock.sendto(push.data, (target, self.port))
+            except OSError as e:
+                logger.warning("Error sending config to %s: %s", push.ip, e)
+
+    def _finish(self, push: ConfigPush, state: str):
+        push.state = state
+        push.done.set()
+        logger.info("Config push to %s %s after %d attempt(s)", push.ip, state, push.attempts)
+        if self.on_result:
+            self.on_result(push.ip, state, push.attempts)
@@ -0,0 +1,108 @@
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from config_push import CONFIG_DEFAULTS, ConfigPusher
+
+logger = logging.getLogger('config_rollout')
+
+
+def config_diff(template: dict, config: dict) -> dict:
+    """Campos de ``template`` cuyo valor difiere del de ``config``."""
+    return {key: value for key, value in template.items()
+            if key != 'IP' and config.get(key) != value}
+
+
+def missing_credentials(config: dict) -> bool:
+    """True si el eco no trae las credenciales WiFi (no se le puede reenviar)."""
+    return not config.get('WiFiSSID') or not config.get('WiFiPWD')
+
+
+def plan_rollout(template: dict, configs: Dict[str, dict]) -> List[Tuple[str, dict, dict]]:
+    """Calcula qué enviar a cada dispositivo.
+
+    Devuelve ``(ip, configuración a enviar, diferencias)`` solo para los
+    dispositivos cuya configuración conocida no coincide con la plantilla.
+    Se envía la configuración completa, como ``ConfigWindow``: los campos
+    escribibles del eco con la plantilla aplicada. Los dispositivos cuyo eco no
+    trae WiFiSSID y WiFiPWD se omiten para no dejarlos sin WiFi.
+    """
+    template = {key: value for key, value in template.items() if key in CONFIG_DEFAULTS}
+    plan = []
+    for ip, config in sorted(configs.items()):
+        diff = config_diff(template, config)
+        if not diff or missing_credentials(config):
+            continue
+        current = {key: config.get(key, default) for key, default in CONFIG_DEFAULTS.items()}
+        plan.append((ip, {'IP': ip, **current, **template}, diff))
+    return plan
+
+
+def common_values(configs: Dict[str, dict]) -> dict:
+    """Valor más frecuente de cada campo escribible en la flota (base para una plantilla)."""
+    counters: Dict[str, Counter] = {}
+    samples = {}
+    for config in configs.values():
+        for key, value in config.items():
+            if key in CONFIG_DEFAULTS:
+                # repr() permite contar también valores no hashables
+                counters.setdefault(key, Counter())[repr(value)] += 1
+                samples[key, repr(value)] = value
+    return {key: samples[key, counter.most_common(1)[0][0]]
+            for key, counter in counters.items()}
+
+
+class ConfigRollout:
+    """Aplica una plantilla de configuración a la flota por oleadas.
+
+    Cada oleada envía como mucho ``wave_size`` configuraciones a través del
+    ``ConfigPusher`` y la siguiente no empieza hasta que todas se han confirmado
+    o han fallado, y al menos ``wave_interval`` segundos después. Así una
+    migración de pool en cientos de equipos no satura la WLAN.
+    Un envío se da por confirmado cuando el eco trae los campos que había que
+    cambiar, aunque otros campos del equipo hayan cambiado por su cuenta.
+    ``on_progress(hechos, total, confirmados, fallidos)`` se llama desde el
+    hilo de la rollout.
+    """
+
+    def __init__(self, pusher: ConfigPusher, wave_size: int = 20, wave_interval: float = 2.0,
+                 wave_timeout: float = 30.0):
+        self.pusher = pusher
+        self.wave_size = wave_size
+        self.wave_interval = wave_interval
+        self.wave_timeout = wave_timeout
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Detiene la rollout al terminar la oleada en curso."""
+        self._cancelled.set()
+
+    def run(self, plan: List[Tuple[str, dict, dict]],
+            on_progress: Optional[Callable[[int, int, int, int], None]] = None
+            ) -> Dict[str, str]:
+        """Ejecuta el ``plan`` y devuelve el estado final de cada IP."""
+        results = {}
+        confirmed = failed = 0
+        for start in range(0, len(plan), self.wave_size):
+            if self._cancelled.is_set():
+                break
+            wave_start = time.monotonic()
+            pushes = [self.pusher.push(ip, config, expected=diff)
+                      for ip, config, diff in plan[start:start + self.wave_size]]
+            deadline = wave_start + self.wave_timeout
+            for push in pushes:
+                push.done.wait(max(0.0, deadline - time.monotonic()))
+                results[push.ip] = push.state
+                if push.state == "confirmed":
+                    confirmed += 1
+                else:
+                    failed += 1
+            if on_progress:
+                on_progress(len(results), len(plan), confirmed, failed)
+            remaining = self.wave_interval - (time.monotonic() - wave_start)
+            if remaining > 0 and start + self.wave_size < len(plan):
+                self._cancelled.wait(remaining)
+        logger.info("Rollout finished: %d confirmed, %d failed of %d",
+                    confirmed, failed, len(plan))
+        return results
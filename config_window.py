@@ -6,7 +6,6 @@ from PySide6.QtCore import Qt
 import json
 import socket
 import threading
-import time
 
 class ConfigWindow(QDialog):
     def __init__(self, device_ip=None, parent=None):
@@ -292,35 +291,26 @@ class ConfigWindow(QDialog):
             QMessageBox.warning(self, "Error", "WiFi Parameter (SSID or PWD) can't be empty.")
             return
             
-        # Enviar configuración
+        # Enviar configuración; la confirmación del dispositivo se informa en el log
         try:
             self.send_config(config)
-            QMessageBox.information(self, "Success", "Configuration sent successfully!")
+            QMessageBox.information(self, "Success",
+                                    "Configuration sent. Confirmation will be shown in the log.")
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to send configuration: {str(e)}")
             
     def send_config(self, config):
-        """Envía la configuración al dispositivo mediante UDP."""
-        json_data = json.dumps(config)
-        data = json_data.encode('utf-8')
-        
-        # Crear socket UDP
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.settimeout(0.1)
-        
-        try:
-            # Enviar 10 veces para asegurar la recepción
-            for _ in range(10):
-                if config["IP"] == "0.0.0.0":
-                    # Broadcast a todos los dispositivos
-                    sock.sendto(data, ('<broadcast>', 12347))
-                else:
-                    # Enviar a un dispositivo específico
-                    sock.sendto(data, (config["IP"], 12347))
-                time.sleep(0.1)
-        finally:
-            sock.close()
+        """Envía la configuración al dispositivo mediante UDP sin bloquear.
+
+        El envío lo hace el ``ConfigPusher`` de la ventana principal, que
+        reenvía solo hasta recibir el eco con la nueva configuración.
+        """
+        pusher = getattr(self.parent, 'config_pusher', None)
+        if pusher is None:
+            raise RuntimeError("Config push service not available")
+        # 0.0.0.0 se envía por broadcast a todos los dispositivos
+        pusher.push(config["IP"], config)
 
     def load_config(self, config):
         """Carga la configuración desde un diccionario."""
@@ -0,0 +1,147 @@
+from typing import Dict
+import numpy as np
+from nm_parse import to_float, to_int
+
+# Marca de valor desconocido en las columnas enteras (p. ej. uptime sin parsear)
+MISSING_INT = np.iinfo(np.int64).min
+
+
+def _int_or_missing(value) -> int:
+    number = to_int(value, None)
+    return MISSING_INT if number is None else number
+
+
+def _text(value) -> bytes:
+    return str(value).encode('utf-8')
+
+
+# Columna -> (tipo NumPy, conversor desde el valor de NetworkDevice). Los textos
+# tal cual llegan van en columnas de bytes de ancho fijo que se ensanchan al
+# recibir uno más largo: ocupan unos pocos bytes por fila y no un objeto str
+COLUMN_TYPES = {
+    'hash_rate': ('S8', _text),
+    'share': ('S8', _text),
+    'net_diff': ('S8', _text),
+    'pool_diff': ('S8', _text),
+    'last_diff': ('S8', _text),
+    'best_diff': ('S8', _text),
+    'uptime': ('S8', _text),
+    'hash_rate_hs': (np.float64, float),
+    'net_diff_value': (np.float64, float),
+    'pool_diff_value': (np.float64, float),
+    'last_diff_value': (np.float64, float),
+    'best_diff_value': (np.float64, float),
+    'shares_accepted': (np.int64, to_int),
+    'shares_rejected': (np.int64, to_int),
+    'uptime_seconds': (np.int64, _int_or_missing),
+    'valid': (np.int64, to_int),
+    'progress': (np.float32, to_float),
+    'temp': (np.float32, to_float),
+    'rssi': (np.float32, to_float),
+    'free_heap': (np.float32, to_float),
+    'last_seen': (np.float64, float),  # time.monotonic() del último paquete
+    'updated_at': (np.float64, float),  # time.time() del último paquete
+    'online': (np.bool_, bool),
+}
+
+# Valor de los textos en una fila nueva, antes del primer paquete
+TEXT_DEFAULTS = {
+    'hash_rate': "0",
+    'share': "0/0",
+    'net_diff': "0",
+    'pool_diff': "0",
+    'last_diff': "0",
+    'best_diff': "0",
+    'uptime': "0",
+}
+
+
+class DeviceColumns:
+    """Almacén columnar de los valores de los dispositivos.
+
+    Cada columna es un array NumPy tipado indexado por la fila del registro,
+    de modo que los agregados sobre toda la flota son operaciones vectoriales.
+    Es el único sitio donde se guardan estos valores: ``NetworkDevice`` los
+    expone como propiedades que leen y escriben su fila.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._size = 0
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.zeros(capacity, dtype=dtype) for name, (dtype, _) in COLUMN_TYPES.items()
+        }
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns.values())
+
+    def ensure_row(self, row: int):
+        """Amplía las columnas (un 50 % cada vez) para alojar ``row``."""
+        capacity = len(self._columns['online'])
+        if row >= capacity:
+            capacity = max(1, capacity)
+            while capacity <= row:
+                capacity += capacity // 2 + 1
+            for name, column in self._columns.items():
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:len(column)] = column
+                self._columns[name] = grown
+        if row >= self._size:
+            for name, default in TEXT_DEFAULTS.items():
+                self._columns[name][self._size:row + 1] = _text(default)
+            self._size = row + 1
+
+    def set(self, row: int, name: str, value) -> bool:
+        """Convierte y guarda el valor de un campo; True si ha cambiado."""
+        column = self._columns[name]
+        if name in TEXT_DEFAULTS:
+            value = _text(value)
+            if len(value) > column.dtype.itemsize:
+                column = self._columns[name] = column.astype(f'S{len(value)}')
+        else:
+            value = column.dtype.type(COLUMN_TYPES[name][1](value))
+        if column[row] == value:
+            return False
+        column[row] = value
+        return True
+
+    def get(self, row: int, name: str):
+        """Valor de un campo en la fila indicada, como tipo nativo de Python.
+
+        Devuelve None para los valores marcados como desconocidos. Los float32
+        se devuelven con su representación más corta (41.3, no 41.29999923706055).
+        """
+        column = self._columns[name]
+        kind = column.dtype.kind
+        if kind == 'S':
+            return column[row].decode('utf-8', 'replace')
+        if column.dtype == np.float32:
+            return float(str(column[row]))
+        value = column[row].item()
+        return None if kind == 'i' and value == MISSING_INT else value
+
+    def row_values(self, row: int, names) -> list:
+        """Valores de varias columnas para una misma fila."""
+        return [self._columns[name][row] for name in names]
+
+    def column(self, name: str) -> np.ndarray:
+        """Vista de la columna limitada a las filas ocupadas."""
+        return self._columns[name][:self._size]
+
+    def total(self, name: str, online_only: bool = True) -> float:
+        return float(self._select(name, online_only).sum())
+
+    def mean(self, name: str, online_only: bool = True) -> float:
+        values = self._select(name, online_only)
+        return float(values.mean()) if len(values) else 0.0
+
+    def max(self, name: str, online_only: bool = True) -> float:
+        values = self._select(name, online_only)
+        return float(values.max()) if len(values) else 0.0
+
+    def _select(self, name: str, online_only: bool) -> np.ndarray:
+        values = self.column(name)
+        return values[self.column('online')] if online_only else values
@@ -0,0 +1,115 @@
+from typing import List
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor
+from nm_device import DeviceRegistry, NetworkDevice
+from nm_parse import format_uptime
+
+
+# (cabecera, campos de NetworkDevice de los que depende, formateador)
+COLUMNS = [
+    ("Device", ('device_id', 'ip'), lambda d: f"{d.device_id} ({d.ip})"),
+    ("Hash Rate", ('hash_rate',), lambda d: d.hash_rate),
+    ("Share", ('share',), lambda d: d.share),
+    ("Net Diff", ('net_diff',), lambda d: d.net_diff),
+    ("Pool Diff", ('pool_diff',), lambda d: d.pool_diff),
+    ("Last Diff", ('last_diff',), lambda d: d.last_diff),
+    ("Best Diff", ('best_diff',), lambda d: d.best_diff),
+    ("Valid", ('valid',), lambda d: str(d.valid)),
+    ("Progress", ('progress',), lambda d: f"{d.progress:.2f}"),
+    ("Temp", ('temp',), lambda d: f"{d.temp:.1f}°C"),
+    ("RSSI", ('rssi',), lambda d: f"{d.rssi:.0f} dBm"),
+    ("Free Heap", ('free_heap',), lambda d: f"{d.free_heap:.1f} KB"),
+    # Si el uptime no se ha podido parsear se muestra el texto recibido
+    ("Uptime", ('uptime', 'uptime_seconds'),
+     lambda d: d.uptime if d.uptime_seconds is None else format_uptime(d.uptime_seconds)),
+    ("Version", ('version',), lambda d: d.version),
+    ("Board Type", ('board_type',), lambda d: d.board_type),
+    ("Pool in Use", ('pool_in_use',), lambda d: d.pool_in_use),
+    ("Last Update", ('update_time',), lambda d: d.update_time),
+]
+
+# Columnas afectadas por cada campo de NetworkDevice
+FIELD_COLUMNS = {}
+for _column, (_, _fields, _) in enumerate(COLUMNS):
+    for _field in _fields:
+        FIELD_COLUMNS.setdefault(_field, []).append(_column)
+# Los dispositivos offline se muestran atenuados en todas las columnas
+FIELD_COLUMNS['is_online'] = list(range(len(COLUMNS)))
+
+OFFLINE_COLOR = QColor(Qt.GlobalColor.gray)
+
+
+class DeviceTableModel(QAbstractTableModel):
+    """Modelo de tabla sobre el registro de dispositivos.
+
+    Las filas son las filas estables del registro, así que una actualización
+    solo invalida las celdas de los campos que han cambiado.
+    """
+
+    def __init__(self, registry: DeviceRegistry, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self._row_count = len(registry)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            device = self.registry.device_at(index.row())
+            return COLUMNS[index.column()][2](device)
+        if role == Qt.ItemDataRole.ForegroundRole:
+            if not self.registry.device_at(index.row()).is_online:
+                return OFFLINE_COLOR
+        return None
+
+    def headerData(self, section: int, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section][0]
+        return str(section + 1)
+
+    def device_at(self, row: int) -> NetworkDevice:
+        return self.registry.device_at(row)
+
+    def device_updated(self, row: int, created: bool, changed: List[str]):
+        """Notifica a la vista el resultado de ``DeviceRegistry.upsert``."""
+        if row is None:
+            return
+        if created or row >= self._row_count:
+            self.sync_rows()
+            return
+        columns = sorted({column for field in changed for column in FIELD_COLUMNS.get(field, ())})
+        # Emitir un dataChanged por cada tramo contiguo de columnas
+        start = prev = None
+        for column in columns:
+            if start is None:
+                start = prev = column
+            elif column == prev + 1:
+                prev = column
+            else:
+                self.dataChanged.emit(self.index(row, start), self.index(row, prev))
+                start = prev = column
+        if start is not None:
+            self.dataChanged.emit(self.index(row, start), self.index(row, prev))
+
+    def sync_rows(self):
+        """Inserta en la vista las filas añadidas al registro."""
+        count = len(self.registry)
+        if count > self._row_count:
+            self.beginInsertRows(QModelIndex(), self._row_count, count - 1)
+            self._row_count = count
+            self.endInsertRows()
+
+    def refresh_all(self):
+        """Invalida todas las celdas visibles."""
+        self.sync_rows()
+        if self._row_count:
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(self._row_count - 1, len(COLUMNS) - 1))
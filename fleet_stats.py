@@ -0,0 +1,152 @@
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class FleetAggregates:
+    """Agregados de la flota mantenidos de forma incremental.
+
+    En cada actualización de un dispositivo se resta su contribución anterior y
+    se suma la nueva, así que el coste por paquete es O(1) sea cual sea el
+    tamaño de la flota. La temperatura máxima sale de un montículo con
+    borrado perezoso: las entradas obsoletas se descartan al consultarla.
+    La última contribución de cada fila se guarda en arrays NumPy, no en una
+    tupla por dispositivo.
+    """
+
+    SHARE_WINDOW = 60  # Segundos de la ventana de shares por minuto
+
+    def __init__(self):
+        self.online_count = 0
+        self.total_hash_rate = 0.0
+        self.pool_hash_rate: Dict[str, float] = {}
+        self._pool_devices: Dict[str, int] = {}
+        self._temp_sum = 0.0
+        self._temp_heap: List[Tuple[float, int]] = []  # (-temp, fila) de los online
+        # Contribución por fila: (online, hash rate, pool, temp, shares aceptadas).
+        # _pools tiene None en las filas que aún no han contribuido
+        self._pools: List[Optional[str]] = []
+        self._online = np.zeros(0, dtype=np.bool_)
+        self._hash_rates = np.zeros(0, dtype=np.float64)
+        self._temps = np.zeros(0, dtype=np.float64)
+        self._shares = np.zeros(0, dtype=np.int64)
+        # Shares aceptadas por segundo en un buffer circular de SHARE_WINDOW huecos
+        self._share_buckets = [0] * self.SHARE_WINDOW
+        self._share_second = 0
+        self._share_total = 0
+
+    @property
+    def mean_temp(self) -> float:
+        return self._temp_sum / self.online_count if self.online_count else 0.0
+
+    @property
+    def max_temp(self) -> float:
+        heap = self._temp_heap
+        while heap:
+            temp, row = -heap[0][0], heap[0][1]
+            if self._online[row] and self._temps[row] == temp:
+                return temp
+            heapq.heappop(heap)
+        return 0.0
+
+    def shares_per_minute(self, now: Optional[float] = None) -> float:
+        self._advance_shares(int(now if now is not None else time.monotonic()))
+        return float(self._share_total) * 60 / self.SHARE_WINDOW
+
+    def update(self, row: int, device, now: Optional[float] = None):
+        """Sustituye la contribución de un dispositivo por sus valores actuales."""
+        new = (device.is_online, float(device.hash_rate_hs), device.pool_in_use,
+               float(device.temp), int(device.shares_accepted))
+        old = self._contribution(row)
+        if old == new:
+            return
+        if old is not None:
+            self._remove(old)
+        self._add(new)
+        self._store(row, new)
+        if new[0] and (old is None or not old[0] or old[3] != new[3]):
+            heapq.heappush(self._temp_heap, (-new[3], row))
+            if len(self._temp_heap) > 2 * self.online_count + 64:
+                # Rehacer el montículo sin las entradas obsoletas (O(1) amortizado)
+                rows = np.flatnonzero(self._online)
+                self._temp_heap = list(zip((-self._temps[rows]).tolist(), rows.tolist()))
+                heapq.heapify(self._temp_heap)
+
+        # Las shares nuevas desde el último paquete cuentan para la tasa por minuto.
+        # Al volver a estar online se toma como nueva base el contador actual,
+        # sin sumar de golpe las shares acumuladas mientras estaba caído.
+        if old is not None and old[0] and new[0] and new[4] > old[4]:
+            self._add_shares(new[4] - old[4],
+                             int(now if now is not None else time.monotonic()))
+
+    def _contribution(self, row: int) -> Optional[Tuple[bool, float, str, float, int]]:
+        pool = self._pools[row] if row < len(self._pools) else None
+        if pool is None:
+            return None
+        return (bool(self._online[row]), float(self._hash_rates[row]), pool,
+                float(self._temps[row]), int(self._shares[row]))
+
+    def _store(self, row: int, contribution):
+        if row >= len(self._pools):
+            self._pools.extend([None] * (row + 1 - len(self._pools)))
+            if row >= len(self._online):
+                # Crecer un 50 % cada vez, como DeviceColumns
+                capacity = max(64, len(self._online))
+                while capacity <= row:
+                    capacity += capacity // 2
+                for name in ('_online', '_hash_rates', '_temps', '_shares'):
+                    column = getattr(self, name)
+                    grown = np.zeros(capacity, dtype=column.dtype)
+                    grown[:len(column)] = column
+                    setattr(self, name, grown)
+        online, hash_rate, pool, temp, shares = contribution
+        self._online[row] = online
+        self._hash_rates[row] = hash_rate
+        self._pools[row] = pool
+        self._temps[row] = temp
+        self._shares[row] = shares
+
+    def _add(self, contribution):
+        online, hash_rate, pool, temp, _ = contribution
+        if not online:
+            return
+        self.online_count += 1
+        self.total_hash_rate += hash_rate
+        self.pool_hash_rate[pool] = self.pool_hash_rate.get(pool, 0.0) + hash_rate
+        self._pool_devices[pool] = self._pool_devices.get(pool, 0) + 1
+        self._temp_sum += temp
+
+    def _remove(self, contribution):
+        online, hash_rate, pool, temp, _ = contribution
+        if not online:
+            return
+        self.online_count -= 1
+        self.total_hash_rate -= hash_rate
+        self._temp_sum -= temp
+        self._pool_devices[pool] -= 1
+        if self._pool_devices[pool]:
+            self.pool_hash_rate[pool] -= hash_rate
+        else:
+            del self._pool_devices[pool]
+            del self.pool_hash_rate[pool]
+        if self.online_count == 0:
+            # Evitar que se acumulen errores de redondeo
+            self.total_hash_rate = 0.0
+            self._temp_sum = 0.0
+
+    def _add_shares(self, count: int, second: int):
+        self._advance_shares(second)
+        self._share_buckets[second % self.SHARE_WINDOW] += count
+        self._share_total += count
+
+    def _advance_shares(self, second: int):
+        """Vacía los huecos de los segundos que han salido de la ventana."""
+        elapsed = second - self._share_second
+        if elapsed <= 0:
+            return
+        for s in range(self._share_second + 1, self._share_second + 1 + min(elapsed, self.SHARE_WINDOW)):
+            index = s % self.SHARE_WINDOW
+            self._share_total -= self._share_buckets[index]
+            self._share_buckets[index] = 0
+        self._share_second = second
@@ -0,0 +1,59 @@
+import os
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from typing import List, Optional
+
+
+class LogSink:
+    """Destino de los mensajes de log de la aplicación.
+
+    Guarda los últimos ``max_lines`` mensajes en un buffer circular y acumula
+    los nuevos hasta que la interfaz los recoge con ``take_pending()``. Cada
+    mensaje cuesta O(1). Opcionalmente los escribe también en un fichero
+    rotativo.
+    """
+
+    def __init__(self, max_lines: int = 1000, level: int = logging.INFO,
+                 file_path: Optional[str] = None, max_bytes: int = 5 * 1024 * 1024,
+                 backup_count: int = 3):
+        self.level = level
+        self._lock = threading.Lock()
+        self._lines = deque(maxlen=max_lines)
+        # Lo pendiente nunca necesita más líneas de las que muestra la ventana
+        self._pending = deque(maxlen=max_lines)
+        self._logger = None
+        if file_path:
+            self._logger = logging.getLogger('nmcontroller')
+            self._logger.setLevel(level)
+            self._logger.propagate = False
+            directory = os.path.dirname(file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(file_path, maxBytes=max_bytes,
+                                          backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            self._logger.addHandler(handler)
+
+    def write(self, message: str, level: int = logging.INFO):
+        """Registra un mensaje. Se puede llamar desde cualquier hilo."""
+        if level < self.level:
+            return
+        with self._lock:
+            self._lines.append(message)
+            self._pending.append(message)
+        if self._logger:
+            self._logger.log(level, message)
+
+    def take_pending(self) -> List[str]:
+        """Devuelve y vacía los mensajes aún no mostrados."""
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+        return pending
+
+    def lines(self) -> List[str]:
+        """Últimos mensajes registrados, del más antiguo al más reciente."""
+        with self._lock:
+            return list(self._lines)
@@ -1,30 +1,57 @@
+import time
+_START_TIME = time.perf_counter()  # Para medir el tiempo hasta el primer pintado
+
 import sys
 import json
 import os
+import threading
+import logging
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                             QHBoxLayout, QLabel, QPushButton, QComboBox,
-                            QLineEdit, QMessageBox, QTableWidget, QTableWidgetItem,
-                            QTabWidget, QGroupBox, QTextEdit, QMenu, QGridLayout)
-from PySide6.QtCore import Qt, QTimer, Signal, Slot
+                            QLineEdit, QMessageBox, QTableView,
+                            QTabWidget, QGroupBox, QPlainTextEdit, QMenu, QGridLayout,
+                            QAbstractItemView, QInputDialog)
+from PySide6.QtCore import Qt, QTimer, Signal, Slot, QObject, QEvent
 from PySide6.QtGui import QIcon, QPixmap, QAction
-import serial
-import serial.tools.list_ports
-from nm_device import NMDevice, NetworkDevice
-import time
-from config_window import ConfigWindow
-import socket
-import threading
+from nm_device import NMDevice, DeviceRegistry, PendingUpdates
+from nm_listener import UDPListener
+from device_model import DeviceTableModel
+from telemetry import TelemetryHistory, METRICS
+from telemetry_store import TelemetryStore
+from nm_parse import format_hash_rate
+from log_sink import LogSink
+from serial_session import SerialSession
+from tcp_sessions import DEFAULT_POOL
+from config_push import ConfigPusher
+from staleness import StalenessSweeper
+
+# Directorio de datos del usuario (telemetría y último registro de dispositivos)
+DATA_DIR = os.path.join(os.path.expanduser('~'), '.nmcontroller')
+# Último registro de dispositivos conocido, para poblar la tabla al arrancar
+SNAPSHOT_FILE = 'devices.json'
+TELEMETRY_FILE = 'telemetry.db'
+# Si se define, el log también se escribe en este fichero rotativo
+LOG_FILE_ENV = 'NMCONTROLLER_LOG_FILE'
 
 class NMController(QMainWindow):
     update_list_signal = Signal()
     update_table_signal = Signal()
     log_signal = Signal(str)  # Nueva señal para el log
     config_received_signal = Signal(dict)  # Nueva señal para configuraciones
-    status_received_signal = Signal(str, dict)  # Nueva señal para actualizaciones de estado
+    ports_found_signal = Signal(list)  # Puertos serie encontrados en segundo plano
+    wifi_configured_signal = Signal(bool, list, str)  # Resultado de configure_wifi
+    bulk_progress_signal = Signal(str, str, str)  # Progreso de una acción sobre varios equipos
+    bulk_finished_signal = Signal(str, list, float)
+    config_push_signal = Signal(str, str, int)  # Resultado de un envío de configuración
+    
+    UI_REFRESH_HZ = 10  # Frecuencia máxima de refresco de la tabla
     
-    def __init__(self):
+    def __init__(self, data_dir: str = DATA_DIR, persist: bool = True, listen: bool = True):
+        """``persist=False`` no lee ni escribe nada en ``data_dir`` y
+        ``listen=False`` no abre los puertos UDP (para pruebas y benchmarks)."""
         super().__init__()
         self.setWindowTitle("NM Controller")
+        self.snapshot_path = os.path.join(data_dir, SNAPSHOT_FILE) if persist else None
         
         # Set application icon
         icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nm.ico")
@@ -37,11 +64,15 @@ class NMController(QMainWindow):
         
         # Initialize variables
         self.serial_port = None
+        self.serial_device_ip = None  # IP notificada por el equipo conectado por serie
         self.network_device = None
         self.is_connected = False
-        self.devices = []
+        self.devices = DeviceRegistry()  # Registro de dispositivos indexado por IP
+        self.load_device_snapshot()
         self.device_configs = {}  # Diccionario para almacenar las configuraciones
-        self._updating_ui = False  # Flag para evitar actualizaciones recursivas
+        self.pending_updates = PendingUpdates()  # Estados recibidos aún no aplicados
+        self.history = TelemetryHistory()  # Histórico de telemetría por dispositivo
+        self.sweeper = StalenessSweeper(self.devices)  # Marca offline los equipos caídos
         
         # Create main widget and layout
         main_widget = QWidget()
@@ -49,14 +80,20 @@ class NMController(QMainWindow):
         layout = QVBoxLayout(main_widget)
         
         # Create log window first
-        self.log_window = QTextEdit()
+        self.log_window = QPlainTextEdit()
         self.log_window.setReadOnly(True)
         self.log_window.setMaximumHeight(100)
         self.log_window.setMinimumHeight(80)
         # Establecer un límite máximo de líneas para el log
         self.max_log_lines = 1000
-        self.current_log_lines = 0
+        self.log_window.setMaximumBlockCount(self.max_log_lines)
         layout.addWidget(self.log_window)
+        self.log_sink = LogSink(self.max_log_lines, file_path=os.environ.get(LOG_FILE_ENV))
+        
+        # Los mensajes se añaden a la ventana en lotes
+        self.log_flush_timer = QTimer()
+        self.log_flush_timer.timeout.connect(self.flush_log)
+        self.log_flush_timer.start(100)
         
         # Create connection controls section
         connection_section = QWidget()
@@ -70,6 +107,7 @@ class NMController(QMainWindow):
         port_baud_layout = QHBoxLayout()
         port_baud_layout.addWidget(QLabel("Port:"))
         self.port_combo = QComboBox()
+        self.ports_found_signal.connect(self.set_ports)
         self.refresh_ports()
         port_baud_layout.addWidget(self.port_combo)
         
@@ -85,6 +123,11 @@ class NMController(QMainWindow):
         
         serial_layout.addLayout(port_baud_layout)
         
+        # Provisioning of many boards at once
+        self.provision_button = QPushButton("Provision Ports...")
+        self.provision_button.clicked.connect(self.open_provision_window)
+        serial_layout.addWidget(self.provision_button)
+        
         # WiFi Configuration
         wifi_group = QGroupBox("WiFi Configuration")
         wifi_layout = QGridLayout()
@@ -109,6 +152,7 @@ class NMController(QMainWindow):
         # Configure button
         self.configure_wifi_button = QPushButton("Configure WiFi")
         self.configure_wifi_button.clicked.connect(self.configure_wifi)
+        self.wifi_configured_signal.connect(self.handle_wifi_configured)
         wifi_layout.addWidget(self.configure_wifi_button, 3, 0, 1, 2)
         
         wifi_group.setLayout(wifi_layout)
@@ -132,21 +176,28 @@ class NMController(QMainWindow):
         instruction_label.setStyleSheet("QLabel { padding: 10px; font-size: 12pt; }")
         
         network_layout.addWidget(instruction_label)
+        
+        # Aplicar una misma configuración a todos los dispositivos que difieren
+        self.rollout_button = QPushButton("Fleet Config Rollout...")
+        self.rollout_button.clicked.connect(self.open_rollout_window)
+        network_layout.addWidget(self.rollout_button)
         network_group.setLayout(network_layout)
         connection_layout.addWidget(network_group)
         
         # Add connection section to main layout
         layout.addWidget(connection_section)
         
+        # Resumen de la flota sobre la tabla
+        self.summary_label = QLabel()
+        self.summary_label.setStyleSheet("QLabel { padding: 4px; font-weight: bold; }")
+        layout.addWidget(self.summary_label)
+        
         # Create device table
-        self.device_table = QTableWidget()
-        self.device_table.setColumnCount(17)
-        self.device_table.setHorizontalHeaderLabels([
-            "Device", "Hash Rate", "Share", "Net Diff", "Pool Diff",
-            "Last Diff", "Best Diff", "Valid", "Progress", "Temp",
-            "RSSI", "Free Heap", "Uptime", "Version", "Board Type",
-            "Pool in Use", "Last Update"
-        ])
+        self.device_table = QTableView()
+        self.device_model = DeviceTableModel(self.devices, self)
+        self.device_table.setModel(self.device_model)
+        self.device_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.device_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.device_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.device_table.customContextMenuRequested.connect(self.show_context_menu)
         layout.addWidget(self.device_table)
@@ -155,124 +206,177 @@ class NMController(QMainWindow):
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.update_devices)
         
+        # Recalcular el ancho de las columnas en un temporizador lento, no por paquete
+        self.resize_columns_timer = QTimer()
+        self.resize_columns_timer.timeout.connect(self.device_table.resizeColumnsToContents)
+        self.resize_columns_timer.start(5000)
+        
+        # Aplicar los estados pendientes a un ritmo fijo, no por paquete
+        self.flush_timer = QTimer()
+        self.flush_timer.timeout.connect(self.flush_pending_updates)
+        self.set_ui_refresh_rate(self.UI_REFRESH_HZ)
+        
+        # Persistir estados y configuraciones en segundo plano
+        self.telemetry_store = None
+        if persist:
+            self.telemetry_store = TelemetryStore(os.path.join(data_dir, TELEMETRY_FILE))
+            try:
+                self.telemetry_store.start()
+            except Exception as e:
+                self.log(f"Telemetry persistence disabled: {str(e)}")
+                self.telemetry_store = None
+        
         # Start listening for configuration updates
-        self.start_config_listener()
+        self.start_config_listener(listen)
+        
+        # Los envíos de configuración se confirman con el eco del puerto 12346
+        self.config_push_signal.connect(self.handle_config_push_result)
+        self.config_pusher = ConfigPusher(on_result=self.config_push_signal.emit)
+        self.config_pusher.start()
         
         # Connect signals
         self.update_list_signal.connect(self.update_device_list)
         self.update_table_signal.connect(self.update_device_table_all)
+        self.bulk_progress_signal.connect(self.handle_bulk_progress)
+        self.bulk_finished_signal.connect(self.handle_bulk_finished)
+        self.bulk_executor = None
+        self._bulk_counts = None
         
         # Initially disable WiFi configuration
         self.disable_wifi_config()
         
-    def start_config_listener(self):
+    def start_config_listener(self, listen: bool = True):
         """Starts a thread to listen for configuration and status updates."""
-        def listen_for_updates():
-            config_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            config_sock.bind(('0.0.0.0', 12346))
-            config_sock.settimeout(0.1)
-            status_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            status_sock.bind(('0.0.0.0', 12345))
-            status_sock.settimeout(0.1)
-            while True:
-                try:
-                    try:
-                        data, addr = config_sock.recvfrom(4096)
-                        config = json.loads(data.decode('utf-8'))
-                        # Emitir señal en lugar de actualizar directamente
-                        self.config_received_signal.emit(config)
-                    except socket.timeout:
-                        pass
-                    try:
-                        data, addr = status_sock.recvfrom(4096)
-                        status = json.loads(data.decode('utf-8'))
-                        ip = addr[0]
-                        # Emitir señal en lugar de actualizar directamente
-                        self.status_received_signal.emit(ip, status)
-                    except socket.timeout:
-                        pass
-                except Exception as e:
-                    self.log_signal.emit(f"Listener error: {str(e)}")
-                    continue
-            
         # Conectar las señales a los slots correspondientes
         self.log_signal.connect(self.log)
         self.config_received_signal.connect(self.handle_config_received)
-        self.status_received_signal.connect(self.handle_status_received)
         
-        thread = threading.Thread(target=listen_for_updates, daemon=True)
-        thread.start()
+        # Los estados se acumulan en pending_updates; las configuraciones se emiten por señal
+        self.listener = UDPListener(
+            on_status=self.pending_updates.push,
+            on_config=lambda config, addr: self.config_received_signal.emit(config),
+            on_error=self.log_signal.emit
+        )
+        if not listen:
+            return
+        try:
+            self.listener.start()
+        except OSError as e:
+            # Sin escucha la ventana sigue siendo útil (puerto serie, configuración)
+            self.log(f"Could not listen on UDP ports {self.listener.status_port}/"
+                     f"{self.listener.config_port}: {str(e)}", logging.ERROR)
+            return
+        self.log(self.listener.buffer_summary())
+        
+        # Los descartes del núcleo (/proc/net/udp) se revisan a ritmo lento
+        self.drops_timer = QTimer()
+        self.drops_timer.timeout.connect(self.check_listener_drops)
+        self.drops_timer.start(5000)
+        
+    def check_listener_drops(self):
+        drops = self.listener.new_kernel_drops()
+        if drops:
+            self.log(f"Kernel dropped {drops} UDP datagrams "
+                     f"(received {self.listener.received} so far)", logging.WARNING)
         
     def handle_config_received(self, config):
         """Maneja la recepción de configuración en el hilo principal."""
-        if self._updating_ui:
-            return
+        if 'IP' in config:
+            self.config_pusher.acknowledge(config)
+            self.device_configs[config['IP']] = config
+            self.log(f"Configuration received from {config['IP']}")
+            if self.telemetry_store:
+                self.telemetry_store.add_config(config['IP'], time.time(), config)
+            if config['IP'] not in self.devices:
+                row, created, changed = self.devices.upsert(
+                    config['IP'], config, device_id=config.get('BoardType', config['IP']))
+                self.sweeper.seen(config['IP'])
+                self.device_model.device_updated(row, created, changed)
             
-        self._updating_ui = True
-        try:
-            if 'IP' in config:
-                self.device_configs[config['IP']] = config
-                self.log(f"Configuration received from {config['IP']}")
-                if not any(d.ip == config['IP'] for d in self.devices):
-                    device = NetworkDevice(
-                        ip=config['IP'],
-                        port=12345,
-                        device_id=config.get('BoardType', config['IP']),
-                        is_online=True,
-                        hash_rate="",
-                        share="",
-                        net_diff="",
-                        pool_diff="",
-                        last_diff="",
-                        best_diff="",
-                        valid=0,
-                        progress=0.0,
-                        temp=0.0,
-                        rssi=0,
-                        free_heap=0.0,
-                        uptime="",
-                        version=config.get('Version', ''),
-                        board_type=config.get('BoardType', ''),
-                        pool_in_use=config.get('PoolInUse', ''),
-                        update_time=""
-                    )
-                    self.devices.append(device)
-                # Actualizar UI directamente en lugar de emitir señales
-                self.update_device_table_all()
-        finally:
-            self._updating_ui = False
+    def handle_config_push_result(self, ip, state, attempts):
+        if state == "confirmed":
+            self.log(f"Configuration applied by {ip} ({attempts} send(s))")
+        elif state == "failed":
+            self.log(f"No confirmation from {ip} after {attempts} sends", logging.WARNING)
+        else:
+            self.log(f"Configuration broadcast sent {attempts} times")
+            
+    def set_ui_refresh_rate(self, hz: float):
+        """Cambia la frecuencia con la que se aplican los estados pendientes."""
+        self.flush_timer.start(max(1, int(1000 / hz)))
+        
+    def flush_pending_updates(self):
+        """Aplica al registro y a la tabla todos los estados acumulados."""
+        for ip, status in self.pending_updates.take().items():
+            # Un estado que no se puede aplicar no debe perder el resto del lote
+            try:
+                self.handle_status_received(ip, status)
+            except Exception as e:
+                self.log(f"Could not apply status from {ip}: {str(e)}", logging.ERROR)
+        for row in self.sweeper.sweep():
+            self.log(f"Device {self.devices.device_at(row).ip} went offline", logging.WARNING)
+            self.device_model.device_updated(row, False, ['is_online'])
+        # Se refresca siempre: la tasa de shares decae aunque no lleguen paquetes
+        self.update_summary()
+            
+    def update_summary(self):
+        """Actualiza la cabecera con los agregados de la flota."""
+        stats = self.devices.stats
+        pools = ", ".join(f"{pool or 'unknown'}: {format_hash_rate(rate)}"
+                          for pool, rate in sorted(stats.pool_hash_rate.items()))
+        self.summary_label.setText(
+            f"Online: {stats.online_count}/{len(self.devices)}   "
+            f"Hash rate: {format_hash_rate(stats.total_hash_rate)}   "
+            f"Shares/min: {stats.shares_per_minute():.1f}   "
+            f"Temp: avg {stats.mean_temp:.1f}°C, max {stats.max_temp:.1f}°C"
+            + (f"   Pools: {pools}" if pools else ""))
             
     def handle_status_received(self, ip, status):
         """Maneja la recepción de estado en el hilo principal."""
-        if self._updating_ui:
+        row, created, changed = self.devices.upsert(ip, status, create=False)
+        if row is None:
+            return
+        self.sweeper.seen(ip)
+        if 'is_online' in changed:
+            self.log(f"Device {ip} is back online")
+        now = time.time()
+        values = self.devices.columns.row_values(row, METRICS)
+        self.history.record(ip, now, values)
+        if self.telemetry_store:
+            self.telemetry_store.add_status(ip, now, values, status)
+        # Actualizar solo las celdas que han cambiado
+        self.device_model.device_updated(row, created, changed)
+        
+    def closeEvent(self, event):
+        """Detiene la escucha y vuelca la telemetría pendiente al cerrar."""
+        self.listener.stop()
+        self.config_pusher.stop()
+        if self.telemetry_store:
+            self.telemetry_store.stop()
+        DEFAULT_POOL.close_all()
+        if self.bulk_executor:
+            self.bulk_executor.close()
+        self.save_device_snapshot()
+        super().closeEvent(event)
+        
+    def load_device_snapshot(self):
+        """Carga los últimos dispositivos conocidos (marcados como offline)."""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
             return
+        try:
+            self.devices.load_snapshot(self.snapshot_path)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error loading device snapshot: {e}")
             
-        self._updating_ui = True
+    def save_device_snapshot(self):
+        """Guarda el registro de dispositivos para el próximo arranque."""
+        if not self.snapshot_path:
+            return
         try:
-            for device in self.devices:
-                if device.ip == ip:
-                    device.hash_rate = status.get('HashRate', device.hash_rate)
-                    device.share = status.get('Share', device.share)
-                    device.net_diff = status.get('NetDiff', device.net_diff)
-                    device.pool_diff = status.get('PoolDiff', device.pool_diff)
-                    device.last_diff = status.get('LastDiff', device.last_diff)
-                    device.best_diff = status.get('BestDiff', device.best_diff)
-                    device.valid = status.get('Valid', device.valid)
-                    device.progress = status.get('Progress', device.progress)
-                    device.temp = status.get('Temp', device.temp)
-                    device.rssi = status.get('RSSI', device.rssi)
-                    device.free_heap = status.get('FreeHeap', device.free_heap)
-                    device.uptime = status.get('Uptime', device.uptime)
-                    device.version = status.get('Version', device.version)
-                    device.board_type = status.get('BoardType', device.board_type)
-                    device.pool_in_use = status.get('PoolInUse', device.pool_in_use)
-                    device.update_time = time.strftime("%Y-%m-%d %H:%M:%S")
-                    device.is_online = True
-                    break
-            # Actualizar UI directamente en lugar de emitir señales
-            self.update_device_table_all()
-        finally:
-            self._updating_ui = False
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            self.devices.save_snapshot(self.snapshot_path)
+        except OSError as e:
+            print(f"Error saving device snapshot: {e}")
         
     def show_context_menu(self, position):
         """Muestra el menú contextual al hacer clic derecho en la tabla."""
@@ -281,8 +385,7 @@ class NMController(QMainWindow):
         # Obtener el dispositivo seleccionado
         row = self.device_table.rowAt(position.y())
         if row >= 0:
-            device_id = self.device_table.item(row, 0).text()
-            ip = device_id.split('(')[1].split(')')[0]
+            ip = self.device_model.device_at(row).ip
             
             # Añadir acciones al menú
             config_action = QAction("Configure Device", self)
@@ -293,10 +396,27 @@ class NMController(QMainWindow):
             web_monitor_action.triggered.connect(lambda: self.open_web_monitor(ip))
             menu.addAction(web_monitor_action)
             
+            # Acciones sobre todas las filas seleccionadas (o solo la pulsada)
+            rows = sorted(index.row() for index in self.device_table.selectionModel().selectedRows())
+            if row not in rows:
+                rows = [row]
+            devices = [self.device_model.device_at(r) for r in rows]
+            suffix = f" ({len(devices)} devices)" if len(devices) > 1 else ""
+            menu.addSeparator()
+            for label, action in (("Start Mining", 'start'), ("Stop Mining", 'stop'),
+                                  ("Set Fan Speed...", 'fan'), ("Reboot", 'reboot')):
+                bulk_action = QAction(label + suffix, self)
+                bulk_action.setEnabled(self._bulk_counts is None)
+                bulk_action.triggered.connect(
+                    lambda checked=False, action=action: self.run_bulk_command(devices, action))
+                menu.addAction(bulk_action)
+            
             menu.exec(self.device_table.viewport().mapToGlobal(position))
             
     def open_config_window(self, device_ip=None):
         """Abre la ventana de configuración."""
+        from config_window import ConfigWindow
+        
         if device_ip and device_ip in self.device_configs:
             # Si tenemos la configuración almacenada, la usamos
             config = self.device_configs[device_ip]
@@ -308,45 +428,93 @@ class NMController(QMainWindow):
             config_window = ConfigWindow(device_ip, self)
             config_window.exec()
         
+    def open_provision_window(self):
+        """Abre la ventana de provisión en paralelo de puertos serie."""
+        from provision_window import ProvisionWindow
+        
+        ports = [self.port_combo.itemText(i) for i in range(self.port_combo.count())]
+        busy_ports = [self.serial_port.name] if self.serial_port else []
+        window = ProvisionWindow(ports, self.ssid_input.text().strip(),
+                                 self.password_input.text().strip(),
+                                 self.btc_input.text().strip(), busy_ports, self)
+        window.exec()
+        
+    def run_bulk_command(self, devices, action):
+        """Ejecuta una acción en segundo plano sobre varios dispositivos."""
+        from bulk_commands import BulkExecutor
+        
+        args = ()
+        if action == 'fan':
+            speed, ok = QInputDialog.getInt(self, "Fan Speed", "Fan speed (%):", 100, 0, 100)
+            if not ok:
+                return
+            args = (speed,)
+        elif action == 'reboot' and len(devices) > 1:
+            answer = QMessageBox.question(self, "Reboot", f"Reboot {len(devices)} devices?")
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+        
+        if self.bulk_executor is None:
+            self.bulk_executor = BulkExecutor()
+        self._bulk_counts = {'total': len(devices), 'done': 0, 'failed': 0, 'action': action}
+        self.log(f"Sending '{action}' to {len(devices)} device(s)")
+        
+        def run():
+            start = time.monotonic()
+            results = self.bulk_executor.run(devices, action, *args,
+                                             on_progress=self.bulk_progress_signal.emit)
+            self.bulk_finished_signal.emit(action, results, time.monotonic() - start)
+        
+        threading.Thread(target=run, daemon=True).start()
+        
+    def handle_bulk_progress(self, ip, state, message):
+        counts = self._bulk_counts
+        if counts is None or state not in ('done', 'failed'):
+            return
+        counts[state] += 1
+        if state == 'failed':
+            self.log(f"{counts['action']} failed on {ip}: {message}", logging.WARNING)
+        self.statusBar().showMessage(
+            f"{counts['action']}: {counts['done'] + counts['failed']}/{counts['total']} "
+            f"({counts['failed']} failed)")
+        
+    def handle_bulk_finished(self, action, results, elapsed):
+        ok = sum(1 for result in results if result.success)
+        message = f"{action}: {ok}/{len(results)} devices OK in {elapsed:.1f} s"
+        self.log(message)
+        self.statusBar().showMessage(message, 10000)
+        self._bulk_counts = None
+        
+    def open_rollout_window(self):
+        """Abre la ventana de despliegue de configuración en la flota."""
+        from rollout_window import RolloutWindow
+        
+        if not self.device_configs:
+            QMessageBox.information(self, "Rollout", "No device configurations received yet")
+            return
+        window = RolloutWindow(self.device_configs, self.config_pusher, self)
+        window.exec()
+        
     def open_web_monitor(self, device_ip):
         """Abre el monitor web del dispositivo."""
         import webbrowser
         webbrowser.open(f"http://{device_ip}")
         
-    def log(self, message: str):
+    def log(self, message: str, level: int = logging.INFO):
         """Adds a message to the log (in English)."""
-        if not hasattr(self, '_updating_ui'):
-            self._updating_ui = False
-            
-        if self._updating_ui:
+        self.log_sink.write(message, level)
+        
+    def flush_log(self):
+        """Añade a la ventana de log los mensajes pendientes."""
+        lines = self.log_sink.take_pending()
+        if not lines:
             return
-            
-        self._updating_ui = True
-        try:
-            # Incrementar el contador de líneas
-            self.current_log_lines += 1
-            
-            # Si excedemos el límite, eliminar las líneas más antiguas
-            if self.current_log_lines > self.max_log_lines:
-                # Obtener el texto actual
-                current_text = self.log_window.toPlainText()
-                # Dividir en líneas
-                lines = current_text.split('\n')
-                # Mantener solo las últimas max_log_lines líneas
-                lines = lines[-self.max_log_lines:]
-                # Actualizar el texto
-                self.log_window.setPlainText('\n'.join(lines))
-                self.current_log_lines = self.max_log_lines
-            
-            # Agregar el nuevo mensaje
-            self.log_window.append(message)
-            
-            # Scroll to the bottom
-            self.log_window.verticalScrollBar().setValue(
-                self.log_window.verticalScrollBar().maximum()
-            )
-        finally:
-            self._updating_ui = False
+        self.log_window.appendPlainText('\n'.join(lines))
+        
+        # Scroll to the bottom
+        self.log_window.verticalScrollBar().setValue(
+            self.log_window.verticalScrollBar().maximum()
+        )
         
     def disable_wifi_config(self):
         """Disable WiFi configuration controls."""
@@ -377,56 +545,61 @@ class NMController(QMainWindow):
                               "SSID and Password are required")
             return
             
-        try:
-            # Crear el objeto JSON de configuración solo con campos que tienen datos
-            config = {}
-            if ssid:
-                config["ssid"] = ssid
-            if password:
-                config["password"] = password
-            if btc:
-                config["btc"] = btc
+        # Crear el objeto JSON de configuración solo con campos que tienen datos
+        config = {}
+        if ssid:
+            config["ssid"] = ssid
+        if password:
+            config["password"] = password
+        if btc:
+            config["btc"] = btc
 
-            # Convertir a JSON y enviar
-            json_config = json.dumps(config)
-            self.log(f"Sending WiFi configuration: {json_config}")
-            
-            # Enviar la configuración
-            self.serial_port.write(f"{json_config}\r\n".encode())
-            self.serial_port.flush()  # Asegurar que se envíe
-            
-            # Esperar y leer la respuesta
-            time.sleep(0.5)  # Dar tiempo para que el dispositivo procese
-            response = ""
-            while self.serial_port.in_waiting:
-                line = self.serial_port.readline().decode().strip()
-                # Eliminar códigos ANSI
-                line = line.replace('\x1b[32m', '').replace('\x1b[0m', '')
-                response += line + "\n"
-                self.log(f"Device response: {line}")
-            
-            # Verificar la respuesta
-            if "Save Wifi SSID" in response and "Save Wifi Password" in response:
-                QMessageBox.information(self, "Success", 
-                                      "WiFi configuration sent successfully.\n\n"
-                                      "Please manually restart the device for the changes to take effect.")
-            else:
-                QMessageBox.warning(self, "Warning", 
-                                  "Unexpected response from device. Please verify the configuration.")
+        # Convertir a JSON y enviar
+        json_config = json.dumps(config)
+        self.log(f"Sending WiFi configuration: {json_config}")
+        self.configure_wifi_button.setEnabled(False)
+        
+        def send():
+            # Termina en cuanto el dispositivo confirma SSID y contraseña
+            try:
+                matched, lines = self.serial_port.request(
+                    json_config, "Save Wifi SSID", "Save Wifi Password", timeout=3.0)
+                self.wifi_configured_signal.emit(matched, lines, "")
+            except Exception as e:
+                self.wifi_configured_signal.emit(False, [], str(e))
                 
-        except Exception as e:
-            self.log(f"Error configuring WiFi: {str(e)}")
+        threading.Thread(target=send, daemon=True).start()
+        
+    def handle_wifi_configured(self, matched, lines, error):
+        """Muestra el resultado de configure_wifi en el hilo principal."""
+        if self.is_connected:
+            self.configure_wifi_button.setEnabled(True)
+        for line in lines:
+            self.log(f"Device response: {line}")
+            
+        if error:
+            self.log(f"Error configuring WiFi: {error}")
             QMessageBox.critical(self, "Error", 
-                               f"Error configuring WiFi: {str(e)}")
+                               f"Error configuring WiFi: {error}")
+        # Verificar la respuesta
+        elif matched:
+            QMessageBox.information(self, "Success", 
+                                  "WiFi configuration sent successfully.\n\n"
+                                  "Please manually restart the device for the changes to take effect.")
+        else:
+            QMessageBox.warning(self, "Warning", 
+                              "Unexpected response from device. Please verify the configuration.")
             
     def toggle_serial_connection(self):
         """Toggle serial connection."""
         if not self.is_connected:
+            import serial
+            
             try:
                 port = self.port_combo.currentText()
                 baud_rate = int(self.baud_combo.currentText())
                 
-                self.serial_port = serial.Serial(port, baud_rate, timeout=1)
+                self.serial_port = SerialSession(serial.Serial(port, baud_rate, timeout=1))
                 self.is_connected = True
                 self.connect_button.setText("Disconnect")
                 self.log(f"Connected to {port} at {baud_rate} baud")
@@ -447,6 +620,7 @@ class NMController(QMainWindow):
                 if self.serial_port:
                     self.serial_port.close()
                 self.serial_port = None
+                self.serial_device_ip = None
                 self.is_connected = False
                 self.connect_button.setText("Connect")
                 self.log("Disconnected from serial port")
@@ -457,8 +631,17 @@ class NMController(QMainWindow):
                                    f"Error disconnecting: {str(e)}")
             
     def refresh_ports(self):
+        """Enumera los puertos serie en segundo plano."""
+        def enumerate_ports():
+            import serial.tools.list_ports
+            
+            self.ports_found_signal.emit(
+                [port.device for port in serial.tools.list_ports.comports()])
+            
+        threading.Thread(target=enumerate_ports, daemon=True).start()
+        
+    def set_ports(self, ports):
         self.port_combo.clear()
-        ports = [port.device for port in serial.tools.list_ports.comports()]
         self.port_combo.addItems(ports)
         self.log(f"Serial ports found: {', '.join(ports) if ports else 'None'}")
         
@@ -467,39 +650,9 @@ class NMController(QMainWindow):
         # Actualizar la tabla
         self.update_device_table_all()
         
-    def format_uptime(self, uptime_str: str) -> str:
-        """Formats the uptime string to remove duplicates and ensure proper spacing."""
-        if not uptime_str:
-            return "0d 00:00:00"
-        # Remove any duplicate entries and extra spaces
-        parts = uptime_str.split()
-        if len(parts) >= 2:
-            return f"{parts[0]} {parts[1]}"
-        return uptime_str
-
     def update_device_table_all(self):
         """Actualiza la tabla con todos los dispositivos detectados."""
-        # Asegurarse de que las actualizaciones de la UI se realizan en el hilo principal
-        QApplication.instance().processEvents()
-        self.device_table.setRowCount(len(self.devices))
-        for row, device in enumerate(self.devices):
-            self.device_table.setItem(row, 0, QTableWidgetItem(f"{device.device_id} ({device.ip})"))
-            self.device_table.setItem(row, 1, QTableWidgetItem(device.hash_rate))
-            self.device_table.setItem(row, 2, QTableWidgetItem(device.share))
-            self.device_table.setItem(row, 3, QTableWidgetItem(device.net_diff))
-            self.device_table.setItem(row, 4, QTableWidgetItem(device.pool_diff))
-            self.device_table.setItem(row, 5, QTableWidgetItem(device.last_diff))
-            self.device_table.setItem(row, 6, QTableWidgetItem(device.best_diff))
-            self.device_table.setItem(row, 7, QTableWidgetItem(str(device.valid)))
-            self.device_table.setItem(row, 8, QTableWidgetItem(f"{device.progress:.2f}"))
-            self.device_table.setItem(row, 9, QTableWidgetItem(f"{device.temp:.1f}°C"))
-            self.device_table.setItem(row, 10, QTableWidgetItem(f"{device.rssi} dBm"))
-            self.device_table.setItem(row, 11, QTableWidgetItem(f"{device.free_heap:.1f} KB"))
-            self.device_table.setItem(row, 12, QTableWidgetItem(self.format_uptime(device.uptime)))
-            self.device_table.setItem(row, 13, QTableWidgetItem(device.version))
-            self.device_table.setItem(row, 14, QTableWidgetItem(device.board_type))
-            self.device_table.setItem(row, 15, QTableWidgetItem(device.pool_in_use))
-            self.device_table.setItem(row, 16, QTableWidgetItem(device.update_time))
+        self.device_model.refresh_all()
         self.device_table.resizeColumnsToContents()
         
     def update_devices(self):
@@ -512,29 +665,8 @@ class NMController(QMainWindow):
             status = device.get_status()
             self.log(f"Device status received: {status}")
             
-            # Update table
-            row = 0
-            self.device_table.setRowCount(1)
-            self.device_table.setItem(row, 0, QTableWidgetItem(status.device_id))
-            self.device_table.setItem(row, 1, QTableWidgetItem(f"{status.hash_rate:.2f} MH/s"))
-            self.device_table.setItem(row, 2, QTableWidgetItem("0/0"))  # share
-            self.device_table.setItem(row, 3, QTableWidgetItem("0"))    # net_diff
-            self.device_table.setItem(row, 4, QTableWidgetItem("0"))    # pool_diff
-            self.device_table.setItem(row, 5, QTableWidgetItem("0"))    # last_diff
-            self.device_table.setItem(row, 6, QTableWidgetItem("0"))    # best_diff
-            self.device_table.setItem(row, 7, QTableWidgetItem("0"))    # valid
-            self.device_table.setItem(row, 8, QTableWidgetItem("0.00")) # progress
-            self.device_table.setItem(row, 9, QTableWidgetItem(f"{status.temperature:.1f}°C"))
-            self.device_table.setItem(row, 10, QTableWidgetItem("0 dBm"))  # rssi
-            self.device_table.setItem(row, 11, QTableWidgetItem("0.0 KB")) # free_heap
-            self.device_table.setItem(row, 12, QTableWidgetItem("0"))      # uptime
-            self.device_table.setItem(row, 13, QTableWidgetItem(""))       # version
-            self.device_table.setItem(row, 14, QTableWidgetItem(""))       # board_type
-            self.device_table.setItem(row, 15, QTableWidgetItem(""))       # pool_in_use
-            self.device_table.setItem(row, 16, QTableWidgetItem(time.strftime("%Y-%m-%d %H:%M:%S")))
-            
-            # Intentar obtener la configuración si no la tenemos
-            if not self.device_configs:
+            # Intentar obtener la configuración si no la tenemos o falta la IP del equipo serie
+            if not self.device_configs or (self.serial_port and not self.serial_device_ip):
                 self.log("No device configuration found, attempting to get it...")
                 try:
                     config = device.get_config()
@@ -542,12 +674,24 @@ class NMController(QMainWindow):
                         self.log(f"Configuration received: {config}")
                         if 'IP' in config:
                             self.device_configs[config['IP']] = config
+                            self.serial_device_ip = config['IP']
                             self.log(f"Device configuration stored for IP: {config['IP']}")
                     else:
                         self.log("No configuration received from device")
                 except Exception as e:
                     self.log(f"Error getting configuration: {str(e)}")
             
+            # El registro está indexado por IP: un equipo por serie solo entra
+            # en la tabla cuando se conoce la IP que ha notificado
+            ip = self.network_device.ip if self.network_device else self.serial_device_ip
+            if ip:
+                row, created, changed = self.devices.upsert(ip, {
+                    'HashRate': f"{status.hash_rate:.2f} MH/s",
+                    'Temp': status.temperature
+                }, device_id=status.device_id)
+                self.sweeper.seen(ip)
+                self.device_model.device_updated(row, created, changed)
+            
         except Exception as e:
             error_msg = f"Error reading data: {str(e)}"
             self.log(error_msg)
@@ -557,9 +701,36 @@ class NMController(QMainWindow):
             else:
                 self.toggle_network_connection()
 
+class FirstPaintProbe(QObject):
+    """Imprime el tiempo hasta el primer pintado de la ventana y cierra la aplicación."""
+    
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            print(f"first_paint_ms={(time.perf_counter() - _START_TIME) * 1000:.1f}", flush=True)
+            QTimer.singleShot(0, QApplication.instance().quit)
+            obj.removeEventFilter(self)
+        return False
+
 def main():
-    app = QApplication(sys.argv)
-    window = NMController()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="NM Controller")
+    parser.add_argument('--data-dir', default=DATA_DIR,
+                        help="Directory for telemetry.db and devices.json")
+    parser.add_argument('--no-persist', action='store_true',
+                        help="Do not read or write anything in the data directory")
+    parser.add_argument('--no-listen', action='store_true',
+                        help="Do not open the UDP status/config ports")
+    parser.add_argument('--startup-benchmark', action='store_true',
+                        help="Print the time to first paint and exit")
+    # El resto de argumentos (p. ej. -platform) son para Qt
+    args, qt_args = parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = NMController(args.data_dir, persist=not args.no_persist,
+                          listen=not args.no_listen)
+    if args.startup_benchmark:
+        probe = FirstPaintProbe(window)
+        window.installEventFilter(probe)
     window.show()
     sys.exit(app.exec())
 
@@ -0,0 +1,143 @@
+import re
+import sys
+import socket
+import struct
+import logging
+import ipaddress
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('net_interfaces')
+
+# ioctl de Linux para leer la dirección y la máscara IPv4 de una interfaz
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891b
+
+
+@dataclass(frozen=True)
+class NetInterface:
+    name: str
+    address: str
+    netmask: str
+
+    @property
+    def network(self) -> ipaddress.IPv4Network:
+        return ipaddress.IPv4Network(f"{self.address}/{self.netmask}", strict=False)
+
+    @property
+    def is_loopback(self) -> bool:
+        return ipaddress.IPv4Address(self.address).is_loopback
+
+
+def _ioctl_address(sock: socket.socket, name: str, request: int) -> Optional[str]:
+    import fcntl
+
+    try:
+        result = fcntl.ioctl(sock.fileno(), request, struct.pack('256s', name[:15].encode()))
+    except OSError:
+        return None  # Interfaz sin IPv4 o desaparecida
+    return socket.inet_ntoa(result[20:24])
+
+
+def _list_linux() -> List[NetInterface]:
+    interfaces = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _, name in socket.if_nameindex():
+            address = _ioctl_address(sock, name, SIOCGIFADDR)
+            netmask = _ioctl_address(sock, name, SIOCGIFNETMASK)
+            if address and netmask:
+                interfaces.append(NetInterface(name, address, netmask))
+    return interfaces
+
+
+def _list_ifconfig() -> List[NetInterface]:
+    """Alternativa para macOS/BSD: una sola llamada a ``ifconfig``."""
+    result = subprocess.run(['ifconfig'], capture_output=True, text=True)
+    interfaces = []
+    name = None
+    for line in result.stdout.splitlines():
+        header = re.match(r'^(\S+?):\s', line)
+        if header:
+            name = header.group(1)
+            continue
+        inet = re.match(r'^\s+inet (\d+\.\d+\.\d+\.\d+) netmask (0x[0-9a-fA-F]+|\S+)', line)
+        if inet and name:
+            netmask = inet.group(2)
+            if netmask.startswith('0x'):
+                netmask = socket.inet_ntoa(int(netmask, 16).to_bytes(4, 'big'))
+            interfaces.append(NetInterface(name, inet.group(1), netmask))
+    return interfaces
+
+
+def list_interfaces() -> List[NetInterface]:
+    """Interfaces con dirección IPv4 del sistema."""
+    try:
+        if sys.platform.startswith('linux'):
+            return _list_linux()
+        return _list_ifconfig()
+    except Exception as e:
+        logger.error("Error listing network interfaces: %s", e)
+        return []
+
+
+class InterfaceCache:
+    """Lista de interfaces cacheada que solo se vuelve a leer cada ``ttl`` segundos.
+
+    ``refresh()`` indica si algo ha cambiado (interfaces nuevas, caídas o con
+    otra dirección) para que quien escuche pueda reconfigurarse.
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._interfaces: List[NetInterface] = []
+        self._loaded_at = None
+
+    def get(self) -> List[NetInterface]:
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._load()
+            return list(self._interfaces)
+
+    def refresh(self) -> bool:
+        """Vuelve a leer las interfaces; True si han cambiado."""
+        with self._lock:
+            return self._load()
+
+    def by_name(self) -> Dict[str, NetInterface]:
+        return {interface.name: interface for interface in self.get()}
+
+    def _load(self) -> bool:
+        interfaces = list_interfaces()
+        changed = self._loaded_at is not None and interfaces != self._interfaces
+        if changed:
+            logger.info("Network interfaces changed: %s",
+                        ", ".join(f"{i.name}={i.address}" for i in interfaces))
+        self._interfaces = interfaces
+        self._loaded_at = time.monotonic()
+        return changed
+
+
+DEFAULT_CACHE = InterfaceCache()
+
+
+def resolve_networks(specs: List[str], cache: InterfaceCache = DEFAULT_CACHE
+                     ) -> List[ipaddress.IPv4Network]:
+    """Convierte nombres de interfaz o subredes (``10.1.0.0/24``) en subredes.
+
+    Lanza ``ValueError`` si un nombre no corresponde a ninguna interfaz con IPv4.
+    """
+    interfaces = cache.by_name()
+    networks = []
+    for spec in specs:
+        if spec in interfaces:
+            networks.append(interfaces[spec].network)
+        else:
+            try:
+                networks.append(ipaddress.IPv4Network(spec, strict=False))
+            except ValueError:
+                raise ValueError(f"Unknown interface or subnet: {spec}") from None
+    return networks
@@ -0,0 +1,167 @@
+"""Colector de telemetría sin interfaz gráfica.
+
+Escucha los puertos de estado y configuración, mantiene el registro de
+dispositivos y persiste o exporta la telemetría sin cargar Qt.
+
+Uso: python nm_daemon.py [--db RUTA] [--no-persist] [--export RUTA]
+"""
+import argparse
+import logging
+import signal
+import threading
+import time
+from typing import List
+from nm_device import DeviceRegistry
+from nm_listener import UDPListener, STATUS_PORT, CONFIG_PORT, RCVBUF_SIZE
+from sharded_ingest import ShardedListener
+from telemetry import METRICS
+from telemetry_store import TelemetryStore, DEFAULT_DB_PATH
+from staleness import StalenessSweeper
+from net_interfaces import DEFAULT_CACHE as INTERFACES, resolve_networks
+
+logger = logging.getLogger('nm_daemon')
+
+
+class CollectorDaemon:
+    """Une el listener UDP, el registro de dispositivos y la persistencia."""
+
+    def __init__(self, store: TelemetryStore = None, export_path: str = None,
+                 export_interval: float = 10.0, host: str = '0.0.0.0',
+                 status_port: int = STATUS_PORT, config_port: int = CONFIG_PORT,
+                 interfaces: List[str] = None, ingest_workers: int = 0,
+                 rcvbuf: int = RCVBUF_SIZE):
+        self.devices = DeviceRegistry()
+        self.sweeper = StalenessSweeper(self.devices)
+        self.device_configs = {}
+        self.store = store
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.interfaces = interfaces or []
+        # Con ingest_workers > 0 la recepción y el decodificado van en varios procesos
+        listener_class, options = UDPListener, {}
+        if ingest_workers > 0:
+            listener_class, options = ShardedListener, {'workers': ingest_workers}
+        self.listener = listener_class(
+            on_status=self.handle_status_received,
+            on_config=self.handle_config_received,
+            on_error=logger.warning,
+            host=host,
+            status_port=status_port,
+            config_port=config_port,
+            networks=resolve_networks(self.interfaces) if self.interfaces else None,
+            rcvbuf=rcvbuf,
+            **options
+        )
+        self._stop = threading.Event()
+
+    def handle_status_received(self, ip: str, status: dict):
+        row, created, changed = self.devices.upsert(ip, status)
+        self.sweeper.seen(ip)
+        if created:
+            logger.info("New device %s (%s)", ip, status.get('BoardType', ''))
+        elif 'is_online' in changed:
+            logger.info("Device %s is back online", ip)
+        if self.store:
+            values = self.devices.columns.row_values(row, METRICS)
+            self.store.add_status(ip, time.time(), values, status)
+
+    def handle_config_received(self, config: dict, addr: tuple):
+        ip = config.get('IP', addr[0])
+        self.device_configs[ip] = config
+        if ip not in self.devices:
+            self.devices.upsert(ip, config, device_id=config.get('BoardType', ip))
+            self.sweeper.seen(ip)
+        if self.store:
+            self.store.add_config(ip, time.time(), config)
+
+    def run(self):
+        """Bloquea hasta que se llama a ``stop()`` o llega SIGINT/SIGTERM."""
+        if self.store:
+            self.store.start()
+        try:
+            self.listener.start()
+            logger.info("Listening on ports %d/%d", self.listener.status_port,
+                        self.listener.config_port)
+            logger.info(self.listener.buffer_summary())
+            next_export = time.monotonic() + self.export_interval
+            while not self._stop.wait(self.sweeper.tick):
+                for row in self.sweeper.sweep():
+                    logger.warning("Device %s went offline", self.devices.device_at(row).ip)
+                if time.monotonic() >= next_export:
+                    self.export()
+                    self.check_interfaces()
+                    self.check_drops()
+                    next_export += self.export_interval
+        finally:
+            self.listener.stop()
+            self.export()
+            if self.store:
+                self.store.stop()
+            logger.info("Stopped with %d devices", len(self.devices))
+
+    def check_drops(self):
+        """Avisa si el núcleo ha descartado datagramas desde la última comprobación."""
+        drops = self.listener.new_kernel_drops()
+        if drops:
+            logger.warning("Kernel dropped %d UDP datagrams (received %d so far)",
+                           drops, self.listener.received)
+
+    def check_interfaces(self):
+        """Vuelve a calcular las subredes atendidas si cambian las interfaces."""
+        if not self.interfaces or not INTERFACES.refresh():
+            return
+        try:
+            networks = resolve_networks(self.interfaces)
+        except ValueError as e:
+            logger.warning("Keeping previous networks: %s", e)
+            return
+        logger.info("Listening on networks %s", ", ".join(map(str, networks)))
+        self.listener.set_networks(networks)
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def export(self):
+        if not self.export_path:
+            return
+        try:
+            self.devices.save_snapshot(self.export_path)
+        except OSError as e:
+            logger.error("Error exporting devices to %s: %s", self.export_path, e)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='nmcontroller-daemon',
+                                     description="Headless NM Controller telemetry collector")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="SQLite telemetry database")
+    parser.add_argument('--no-persist', action='store_true', help="Do not write telemetry to SQLite")
+    parser.add_argument('--export', metavar='PATH', help="Periodically write the device list as JSON")
+    parser.add_argument('--export-interval', type=float, default=10.0)
+    parser.add_argument('--host', default='0.0.0.0', help="Address to bind the listeners to")
+    parser.add_argument('--interface', action='append', default=[], metavar='NAME|CIDR',
+                        help="Only accept devices on this interface's subnet or on this "
+                             "subnet; repeat for several VLANs")
+    parser.add_argument('--ingest-workers', type=int, default=0, metavar='N',
+                        help="Receive and decode packets in N processes (Linux only)")
+    parser.add_argument('--rcvbuf', type=int, default=RCVBUF_SIZE, metavar='BYTES',
+                        help="SO_RCVBUF requested for the UDP sockets")
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    store = None if args.no_persist else TelemetryStore(args.db)
+    try:
+        daemon = CollectorDaemon(store, args.export, args.export_interval, args.host,
+                                 interfaces=args.interface,
+                                 ingest_workers=args.ingest_workers,
+                                 rcvbuf=args.rcvbuf)
+    except ValueError as e:
+        parser.error(str(e))
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,26 @@
+import sys
 import json
 import time
 import socket
 import threading
-import subprocess
-from dataclasses import dataclass
-from typing import Optional, List, Dict
+import os
+import logging
+from functools import lru_cache
+from dataclasses import dataclass, field as dataclass_field, fields as dataclass_fields
+from typing import Optional, List, Dict, Set, Tuple, Iterator, Callable
+from device_columns import DeviceColumns, COLUMN_TYPES
+from nm_parse import PARSED_FIELDS
+from fleet_stats import FleetAggregates
+from serial_session import SerialSession
+from tcp_sessions import DEFAULT_POOL, SessionPool
+from net_interfaces import DEFAULT_CACHE as INTERFACES
+from nm_listener import MAX_DATAGRAM, set_receive_buffer
+from staleness import BROADCAST_INTERVAL
+
+logger = logging.getLogger('nm_device')
+
+# __slots__ en las dataclasses solo está disponible desde Python 3.10
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
 
 @dataclass
 class DeviceStatus:
@@ -15,35 +31,330 @@ class DeviceStatus:
     is_mining: bool
     error: Optional[str] = None
 
-@dataclass
+# Campos que solo existen en las columnas NumPy: los textos de estado (hash_rate,
+# share, *_diff, uptime), valid, progress, temp, rssi, free_heap, los valores
+# parseados (hash_rate_hs, *_diff_value, shares, uptime_seconds), last_seen y updated_at
+COLUMN_FIELDS = tuple(name for name in COLUMN_TYPES if name != 'online')
+
+# Columnas que no se guardan en los snapshots: last_seen es del reloj monótono
+# de este proceso y updated_at se guarda como texto en update_time
+LOCAL_FIELDS = {'last_seen', 'updated_at'}
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@lru_cache(maxsize=64)
+def _format_time(second: int) -> str:
+    return time.strftime(TIME_FORMAT, time.localtime(second))
+
+
+@dataclass(**_SLOTS)
 class NetworkDevice:
     ip: str
     port: int
     device_id: str
     is_online: bool
-    hash_rate: str = "0"
-    share: str = "0/0"
-    net_diff: str = "0"
-    pool_diff: str = "0"
-    last_diff: str = "0"
-    best_diff: str = "0"
-    valid: int = 0
-    progress: float = 0.0
-    temp: float = 0.0
-    rssi: float = 0.0
-    free_heap: float = 0.0
-    uptime: str = "0"
     version: str = ""
     board_type: str = ""
     pool_in_use: str = ""
-    update_time: str = ""
+    # Fila del almacén columnar con los campos de COLUMN_FIELDS
+    _columns: Optional[DeviceColumns] = dataclass_field(default=None, repr=False, compare=False)
+    _row: int = dataclass_field(default=0, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self._columns is None:
+            # Dispositivo fuera de un registro: columnas propias de una sola fila
+            self._columns = DeviceColumns(capacity=1)
+            self._columns.ensure_row(0)
+
+    @property
+    def update_time(self) -> str:
+        """Hora del último paquete como texto ("" si aún no ha llegado ninguno)."""
+        second = self._columns.get(self._row, 'updated_at')
+        return _format_time(int(second)) if second else ""
+
+    def to_dict(self) -> dict:
+        """Todos los campos, incluidos los columnares (para los snapshots JSON)."""
+        data = {f.name: getattr(self, f.name) for f in dataclass_fields(self) if f.compare}
+        data.update((name, getattr(self, name)) for name in COLUMN_FIELDS
+                    if name not in LOCAL_FIELDS)
+        data['update_time'] = self.update_time
+        return data
+
+
+def _column_property(name: str) -> property:
+    def get_value(device):
+        return device._columns.get(device._row, name)
+
+    def set_value(device, value):
+        device._columns.set(device._row, name, value)
+
+    return property(get_value, set_value)
+
+
+for _name in COLUMN_FIELDS:
+    setattr(NetworkDevice, _name, _column_property(_name))
+
+# Textos con pocos valores distintos en la flota, que se comparten con sys.intern
+INTERNED_FIELDS = {'version', 'board_type', 'pool_in_use'}
+
+# Correspondencia entre las claves JSON de los paquetes y los campos de NetworkDevice
+STATUS_FIELDS = {
+    'HashRate': 'hash_rate',
+    'Share': 'share',
+    'NetDiff': 'net_diff',
+    'PoolDiff': 'pool_diff',
+    'LastDiff': 'last_diff',
+    'BestDiff': 'best_diff',
+    'Valid': 'valid',
+    'Progress': 'progress',
+    'Temp': 'temp',
+    'RSSI': 'rssi',
+    'FreeHeap': 'free_heap',
+    'Uptime': 'uptime',
+    'Version': 'version',
+    'BoardType': 'board_type',
+    'PoolInUse': 'pool_in_use',
+}
+
+class DeviceRegistry:
+    """Registro de dispositivos indexado por IP.
+
+    Cada dispositivo recibe un número de fila estable (su posición de inserción).
+    Mantiene índices secundarios por tipo de placa y por pool en uso, y una copia
+    tipada de los campos numéricos en ``columns`` y los agregados de la flota,
+    actualizados en cada upsert, en ``stats``.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._devices: List[NetworkDevice] = []
+        self._by_ip: Dict[str, int] = {}
+        self._by_board_type: Dict[str, Set[int]] = {}
+        self._by_pool: Dict[str, Set[int]] = {}
+        self.columns = DeviceColumns()
+        self.stats = FleetAggregates()
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self._by_ip
+
+    def __iter__(self) -> Iterator[NetworkDevice]:
+        with self._lock:
+            return iter(list(self._devices))
+
+    def get(self, ip: str) -> Optional[NetworkDevice]:
+        """Devuelve el dispositivo con la IP indicada, si existe."""
+        row = self._by_ip.get(ip)
+        return self._devices[row] if row is not None else None
+
+    def row_of(self, ip: str) -> Optional[int]:
+        """Devuelve la fila estable asignada a una IP."""
+        return self._by_ip.get(ip)
+
+    def device_at(self, row: int) -> NetworkDevice:
+        return self._devices[row]
+
+    def by_board_type(self, board_type: str) -> List[NetworkDevice]:
+        with self._lock:
+            return [self._devices[row] for row in sorted(self._by_board_type.get(board_type, ()))]
+
+    def by_pool(self, pool: str) -> List[NetworkDevice]:
+        with self._lock:
+            return [self._devices[row] for row in sorted(self._by_pool.get(pool, ()))]
+
+    def save_snapshot(self, path: str):
+        """Guarda el estado de todos los dispositivos en un fichero JSON."""
+        with self._lock:
+            devices = [device.to_dict() for device in self._devices]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(devices, f)
+        # Reemplazo atómico para no dejar nunca un fichero a medias
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: str):
+        """Añade los dispositivos de un fichero de ``save_snapshot`` como offline."""
+        with open(path) as f:
+            devices = json.load(f)
+        with self._lock:
+            for fields in devices:
+                if fields['ip'] in self._by_ip:
+                    continue
+                values = {name: fields.pop(name) for name in COLUMN_FIELDS if name in fields}
+                update_time = fields.pop('update_time', "")
+                row = len(self._devices)
+                self.columns.ensure_row(row)
+                device = NetworkDevice(**fields, _columns=self.columns, _row=row)
+                device.is_online = False
+                self._devices.append(device)
+                self._by_ip[device.ip] = row
+                self._index(row, device)
+                for field, value in values.items():
+                    if field not in LOCAL_FIELDS:
+                        self.columns.set(row, field, value)
+                for field in PARSED_FIELDS:
+                    self._set_parsed(row, device, field, getattr(device, field))
+                try:
+                    device.updated_at = time.mktime(time.strptime(update_time, TIME_FORMAT))
+                except ValueError:
+                    pass
+                # El reloj monótono no sobrevive a un reinicio
+                device.last_seen = 0.0
+                self.stats.update(row, device)
+
+    def upsert(self, ip: str, data: dict, port: int = 12345,
+               device_id: Optional[str] = None,
+               create: bool = True) -> Tuple[Optional[int], bool, List[str]]:
+        """Crea o actualiza un dispositivo a partir de un paquete JSON.
+
+        Devuelve ``(fila, creado, campos_cambiados)``. Si el dispositivo no existe
+        y ``create`` es False, devuelve ``(None, False, [])``.
+        """
+        with self._lock:
+            row = self._by_ip.get(ip)
+            created = row is None
+            if created:
+                if not create:
+                    return None, False, []
+                row = len(self._devices)
+                self.columns.ensure_row(row)
+                self.columns.set(row, 'online', True)
+                device = NetworkDevice(
+                    ip=ip,
+                    port=port,
+                    device_id=device_id if device_id is not None else data.get('BoardType', ''),
+                    is_online=True,
+                    _columns=self.columns,
+                    _row=row
+                )
+                self._devices.append(device)
+                self._by_ip[ip] = row
+                self._index(row, device)
+            device = self._devices[row]
+            old_board_type = device.board_type
+            old_pool = device.pool_in_use
+
+            changed = []
+            for key, field in STATUS_FIELDS.items():
+                if key in data:
+                    value = data[key]
+                    if field in COLUMN_TYPES:
+                        updated = self.columns.set(row, field, value)
+                    else:
+                        if field in INTERNED_FIELDS and isinstance(value, str):
+                            value = sys.intern(value)
+                        updated = getattr(device, field) != value
+                        if updated:
+                            setattr(device, field, value)
+                    if updated:
+                        changed.append(field)
+                        if field in PARSED_FIELDS:
+                            self._set_parsed(row, device, field, value, changed)
+            device.updated_at = time.time()
+            device.last_seen = time.monotonic()
+            changed.append('update_time')
+            if not device.is_online:
+                device.is_online = True
+                self.columns.set(row, 'online', True)
+                changed.append('is_online')
+
+            if device.board_type != old_board_type or device.pool_in_use != old_pool:
+                self._unindex(row, old_board_type, old_pool)
+                self._index(row, device)
+            self.stats.update(row, device)
+            return row, created, changed
+
+    def mark_offline(self, ip: str) -> Optional[int]:
+        """Marca un dispositivo como offline; devuelve su fila si estaba online."""
+        with self._lock:
+            row = self._by_ip.get(ip)
+            if row is None or not self._devices[row].is_online:
+                return None
+            device = self._devices[row]
+            device.is_online = False
+            self.columns.set(row, 'online', False)
+            self.stats.update(row, device)
+            return row
+
+    def _set_parsed(self, row: int, device: NetworkDevice, field: str, value,
+                    changed: Optional[List[str]] = None):
+        """Actualiza los campos numéricos derivados de un campo en texto."""
+        for parsed_field, parsed in PARSED_FIELDS[field](value):
+            if parsed_field in COLUMN_TYPES:
+                updated = self.columns.set(row, parsed_field, parsed)
+            else:
+                updated = getattr(device, parsed_field) != parsed
+                if updated:
+                    setattr(device, parsed_field, parsed)
+            if updated and changed is not None:
+                changed.append(parsed_field)
+
+    def _index(self, row: int, device: NetworkDevice):
+        self._by_board_type.setdefault(device.board_type, set()).add(row)
+        self._by_pool.setdefault(device.pool_in_use, set()).add(row)
+
+    def _unindex(self, row: int, board_type: str, pool: str):
+        self._by_board_type.get(board_type, set()).discard(row)
+        self._by_pool.get(pool, set()).discard(row)
+
+class PendingUpdates:
+    """Conjunto de dispositivos con estado pendiente de aplicar al registro.
+
+    El hilo de escucha escribe aquí cada paquete; el hilo principal lo vacía a
+    su propio ritmo. Los paquetes de una misma IP se fusionan en orden, así que
+    nunca se pierde el último valor de ningún campo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def push(self, ip: str, status: dict):
+        with self._lock:
+            merged = self._pending.get(ip)
+            if merged is None:
+                self._pending[ip] = dict(status)
+            else:
+                merged.update(status)
+
+    def take(self) -> Dict[str, dict]:
+        """Devuelve y vacía las actualizaciones pendientes."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+class RateLimiter:
+    """Deja pasar como mucho un evento por clave cada ``interval`` segundos."""
+
+    def __init__(self, interval: float = 10.0):
+        self.interval = interval
+        self._last: Dict[object, float] = {}
+
+    def allow(self, key) -> bool:
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            return False
+        self._last[key] = now
+        return True
 
 class NMDevice:
     DISCOVERY_PORT = 12345  # Puerto para descubrimiento de dispositivos (igual que el original)
     
-    def __init__(self, serial_port=None, network_device: NetworkDevice = None):
+    def __init__(self, serial_port=None, network_device: NetworkDevice = None,
+                 tcp_pool: SessionPool = None):
+        # Un puerto pyserial se envuelve en una sesión con hilo lector propio
+        if serial_port is not None and not isinstance(serial_port, SerialSession):
+            serial_port = SerialSession(serial_port)
         self.serial_port = serial_port
         self.network_device = network_device
+        # Las conexiones TCP se reutilizan entre comandos e instancias
+        self.tcp_pool = tcp_pool or DEFAULT_POOL
         self.status = DeviceStatus(
             device_id="",
             hash_rate=0.0,
@@ -53,221 +364,201 @@ class NMDevice:
         )
         self._discovery_thread = None
         self._keep_listening = False
-        self._discovered_devices = []
+        self._discovered_devices: Optional[DeviceRegistry] = None  # Solo para el descubrimiento
+        self._log_limiter = RateLimiter()  # Limita el log por dispositivo en el descubrimiento
+        self.last_error: Optional[str] = None  # Motivo del último comando no enviado
         
     @staticmethod
     def get_network_interfaces() -> List[str]:
-        """Obtiene las interfaces de red disponibles."""
-        interfaces = []
-        try:
-            # En macOS, usamos networksetup para obtener las interfaces
-            result = subprocess.run(['networksetup', '-listallhardwareports'], 
-                                 capture_output=True, text=True)
-            for line in result.stdout.split('\n'):
-                if 'Device:' in line:
-                    device = line.split('Device:')[1].strip()
-                    if device and device != 'lo0':  # Excluir loopback
-                        interfaces.append(device)
-        except Exception as e:
-            print(f"Error getting network interfaces: {e}")
-        return interfaces
+        """Obtiene las interfaces de red disponibles (sin loopback)."""
+        return [interface.name for interface in INTERFACES.get() if not interface.is_loopback]
         
     @staticmethod
     def get_interface_ip(interface: str) -> Optional[str]:
         """Obtiene la dirección IP de una interfaz específica."""
-        try:
-            # En macOS, usamos ifconfig para obtener la IP
-            result = subprocess.run(['ifconfig', interface], 
-                                 capture_output=True, text=True)
-            for line in result.stdout.split('\n'):
-                if 'inet ' in line:
-                    return line.split('inet ')[1].split(' ')[0]
-        except Exception as e:
-            print(f"Error getting IP for interface {interface}: {e}")
-        return None
+        found = INTERFACES.by_name().get(interface)
+        return found.address if found else None
         
     def _listen_for_devices(self):
         """Escucha continuamente mensajes de dispositivos."""
-        listen_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listen_sock = self._discovery_socket()
         try:
-            listen_sock.bind(('', self.DISCOVERY_PORT))
-            print(f"Escuchando en puerto {self.DISCOVERY_PORT}")
+            self._bind_discovery(listen_sock, self.DISCOVERY_PORT)
+            # Sin timeout, recvfrom no vuelve a mirar _keep_listening si no llega nada
+            listen_sock.settimeout(0.5)
+            logger.info("Escuchando en puerto %d", self.DISCOVERY_PORT)
+            buffer = bytearray(MAX_DATAGRAM)
             
             while self._keep_listening:
                 try:
-                    data, addr = listen_sock.recvfrom(1024)
-                    print(f"Mensaje recibido de {addr}: {data}")
-                    
-                    try:
-                        response_text = data.decode('utf-8')
-                        print(f"Mensaje decodificado: {response_text}")
-                        
-                        try:
-                            device_data = json.loads(response_text)
-                            print(f"Datos del dispositivo: {device_data}")
-                            
-                            # Verificar si ya tenemos este dispositivo
-                            device_exists = False
-                            for device in self._discovered_devices:
-                                if device.ip == addr[0]:
-                                    # Actualizar datos del dispositivo existente
-                                    device.hash_rate = device_data.get('HashRate', device.hash_rate)
-                                    device.share = device_data.get('Share', device.share)
-                                    device.net_diff = device_data.get('NetDiff', device.net_diff)
-                                    device.pool_diff = device_data.get('PoolDiff', device.pool_diff)
-                                    device.last_diff = device_data.get('LastDiff', device.last_diff)
-                                    device.best_diff = device_data.get('BestDiff', device.best_diff)
-                                    device.valid = device_data.get('Valid', device.valid)
-                                    device.progress = device_data.get('Progress', device.progress)
-                                    device.temp = device_data.get('Temp', device.temp)
-                                    device.rssi = device_data.get('RSSI', device.rssi)
-                                    device.free_heap = device_data.get('FreeHeap', device.free_heap)
-                                    device.uptime = device_data.get('Uptime', device.uptime)
-                                    device.version = device_data.get('Version', device.version)
-                                    device.board_type = device_data.get('BoardType', device.board_type)
-                                    device.pool_in_use = device_data.get('PoolInUse', device.pool_in_use)
-                                    device.update_time = time.strftime("%Y-%m-%d %H:%M:%S")
-                                    device.is_online = True
-                                    device_exists = True
-                                    print(f"Dispositivo actualizado: {addr[0]}")
-                                    break
-                            
-                            if not device_exists:
-                                new_device = NetworkDevice(
-                                    ip=addr[0],
-                                    port=addr[1],
-                                    device_id=device_data.get('BoardType', ''),
-                                    is_online=True,
-                                    hash_rate=device_data.get('HashRate', '0'),
-                                    share=device_data.get('Share', '0/0'),
-                                    net_diff=device_data.get('NetDiff', '0'),
-                                    pool_diff=device_data.get('PoolDiff', '0'),
-                                    last_diff=device_data.get('LastDiff', '0'),
-                                    best_diff=device_data.get('BestDiff', '0'),
-                                    valid=device_data.get('Valid', 0),
-                                    progress=device_data.get('Progress', 0.0),
-                                    temp=device_data.get('Temp', 0.0),
-                                    rssi=device_data.get('RSSI', 0.0),
-                                    free_heap=device_data.get('FreeHeap', 0.0),
-                                    uptime=device_data.get('Uptime', '0'),
-                                    version=device_data.get('Version', ''),
-                                    board_type=device_data.get('BoardType', ''),
-                                    pool_in_use=device_data.get('PoolInUse', ''),
-                                    update_time=time.strftime("%Y-%m-%d %H:%M:%S")
-                                )
-                                self._discovered_devices.append(new_device)
-                                print(f"Nuevo dispositivo encontrado: {addr[0]}")
-                                
-                            # Imprimir estado actual de todos los dispositivos
-                            print("\nEstado actual de los dispositivos:")
-                            for device in self._discovered_devices:
-                                print(f"\nDispositivo: {device.device_id} ({device.ip})")
-                                print(f"  Hash Rate: {device.hash_rate}")
-                                print(f"  Share: {device.share}")
-                                print(f"  Net Diff: {device.net_diff}")
-                                print(f"  Pool Diff: {device.pool_diff}")
-                                print(f"  Last Diff: {device.last_diff}")
-                                print(f"  Best Diff: {device.best_diff}")
-                                print(f"  Valid: {device.valid}")
-                                print(f"  Progress: {device.progress}")
-                                print(f"  Temp: {device.temp}°C")
-                                print(f"  RSSI: {device.rssi} dBm")
-                                print(f"  Free Heap: {device.free_heap} KB")
-                                print(f"  Uptime: {device.uptime}")
-                                print(f"  Version: {device.version}")
-                                print(f"  Board Type: {device.board_type}")
-                                print(f"  Pool in Use: {device.pool_in_use}")
-                                print(f"  Last Update: {device.update_time}")
-                                
-                        except json.JSONDecodeError as e:
-                            print(f"Error decodificando JSON de {addr[0]}: {e}")
-                    except UnicodeDecodeError as e:
-                        print(f"Error decodificando mensaje de {addr[0]}: {e}")
-                        
+                    size, addr = listen_sock.recvfrom_into(buffer)
+                    self._handle_discovery(buffer[:size], addr)
                 except socket.timeout:
                     continue
                 except Exception as e:
-                    print(f"Error recibiendo mensaje: {e}")
+                    logger.error("Error recibiendo mensaje: %s", e)
                     
         except Exception as e:
-            print(f"Error en el hilo de escucha: {e}")
+            logger.error("Error en el hilo de escucha: %s", e)
         finally:
             listen_sock.close()
             
     @staticmethod
-    def discover_network_devices() -> List[NetworkDevice]:
-        """Busca dispositivos NM en la red local."""
-        print("Iniciando búsqueda de dispositivos...")
-        
-        # Crear una instancia para manejar el descubrimiento
-        discoverer = NMDevice()
-        discoverer._keep_listening = True
-        discoverer._discovery_thread = threading.Thread(target=discoverer._listen_for_devices)
-        discoverer._discovery_thread.daemon = True
-        discoverer._discovery_thread.start()
-        
-        # Esperar un tiempo para recibir respuestas
-        time.sleep(5)  # Esperar 5 segundos por respuestas iniciales
+    def _discovery_socket() -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Permite varias búsquedas a la vez. En Linux solo comparte el puerto con
+        # sockets que también activan SO_REUSEADDR: UDPListener y nm_daemon no lo
+        # hacen, así que con la GUI o el daemon escuchando el bind falla
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        logger.debug("Buffer de recepción: %d bytes", set_receive_buffer(sock))
+        return sock
+
+    @staticmethod
+    def _bind_discovery(sock: socket.socket, port: int):
+        try:
+            sock.bind(('', port))
+        except OSError as e:
+            raise OSError(e.errno, f"Cannot listen on UDP port {port} for discovery "
+                                   f"(is the GUI or nm_daemon already listening?): "
+                                   f"{e.strerror}") from e
         
-        # Detener la escucha
-        discoverer._keep_listening = False
-        discoverer._discovery_thread.join(timeout=1)
+    def _handle_discovery(self, data: bytes, addr: tuple) -> Optional[NetworkDevice]:
+        """Registra un mensaje recibido; devuelve el dispositivo si es nuevo."""
+        try:
+            device_data = json.loads(data.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            if self._log_limiter.allow(('error', addr[0])):
+                logger.warning("Mensaje no válido de %s: %s", addr[0], e)
+            return None
+            
+        if self._discovered_devices is None:
+            # Se crea aquí: los NMDevice de comandos y de sondeo no la necesitan
+            self._discovered_devices = DeviceRegistry()
+        row, created, _ = self._discovered_devices.upsert(addr[0], device_data, port=addr[1])
+        if logger.isEnabledFor(logging.DEBUG) and self._log_limiter.allow(addr[0]):
+            logger.debug("Datos del dispositivo %s: %s", addr[0], device_data)
+        if created:
+            logger.info("Nuevo dispositivo encontrado: %s", addr[0])
+            return self._discovered_devices.device_at(row)
+        return None
         
-        print(f"Búsqueda completada. Dispositivos encontrados: {len(discoverer._discovered_devices)}")
-        for device in discoverer._discovered_devices:
-            print(f"  - {device.device_id} ({device.ip})")
+    @staticmethod
+    def iter_network_devices(quiet_period: float = BROADCAST_INTERVAL / 2,
+                             timeout: float = BROADCAST_INTERVAL,
+                             port: int = DISCOVERY_PORT) -> Iterator[NetworkDevice]:
+        """Devuelve cada dispositivo NM en cuanto llega su primer mensaje.
+
+        La escucha es pasiva: hasta el primer dispositivo se espera como mucho
+        ``timeout`` segundos (por defecto, un intervalo de difusión completo,
+        para oír a todos los equipos al menos una vez). Después, la búsqueda
+        termina cuando pasan ``quiet_period`` segundos sin ningún dispositivo
+        nuevo, o al llegar a ``timeout``. Lanza ``OSError`` si el puerto ya lo
+        usa otro listener (la GUI o ``nm_daemon``).
+        """
+        discoverer = NMDevice()
+        sock = discoverer._discovery_socket()
+        try:
+            discoverer._bind_discovery(sock, port)
+            start = time.monotonic()
+            last_new = None  # El periodo de silencio empieza con el primer dispositivo
+            buffer = bytearray(MAX_DATAGRAM)
+            while True:
+                deadline = start + timeout
+                if last_new is not None:
+                    deadline = min(deadline, last_new + quiet_period)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                sock.settimeout(remaining)
+                try:
+                    size, addr = sock.recvfrom_into(buffer)
+                except socket.timeout:
+                    break
+                device = discoverer._handle_discovery(buffer[:size], addr)
+                if device is not None:
+                    last_new = time.monotonic()
+                    yield device
+        finally:
+            sock.close()
             
-        return discoverer._discovered_devices
+    @staticmethod
+    def discover_network_devices(on_device: Callable[[NetworkDevice], None] = None,
+                                 quiet_period: float = BROADCAST_INTERVAL / 2,
+                                 timeout: float = BROADCAST_INTERVAL,
+                                 port: int = DISCOVERY_PORT) -> List[NetworkDevice]:
+        """Busca dispositivos NM en la red local.
+
+        ``on_device`` se llama con cada dispositivo según se descubre; la lista
+        completa se devuelve al terminar.
+        """
+        logger.info("Iniciando búsqueda de dispositivos...")
+        devices = []
+        for device in NMDevice.iter_network_devices(quiet_period, timeout, port):
+            devices.append(device)
+            if on_device:
+                on_device(device)
+            
+        logger.info("Búsqueda completada. Dispositivos encontrados: %d", len(devices))
+        for device in devices:
+            logger.info("  - %s (%s)", device.device_id, device.ip)
+            
+        return devices
         
     def send_command(self, command: str) -> bool:
+        self.last_error = None
         try:
             if self.serial_port:
-                print(f"Sending command to serial port: {command}")
-                # Enviar el comando con el formato correcto para ESP32
-                self.serial_port.write(f"{command}\r\n".encode())
-                # Esperar un momento para asegurar que el comando se envía
-                time.sleep(0.1)
-                # Limpiar el buffer de entrada antes de leer la respuesta
-                self.serial_port.reset_input_buffer()
+                logger.debug("Sending command to serial port: %s", command)
+                # Descartar lo recibido antes del comando; la respuesta llega después
+                self.serial_port.discard_pending()
+                self.serial_port.write_line(command)
             elif self.network_device:
-                print(f"Sending command to network device: {command}")
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(1)
-                sock.connect((self.network_device.ip, self.network_device.port))
-                sock.send(f"{command}\n".encode())
-                sock.close()
+                logger.debug("Sending command to network device: %s", command)
+                self._tcp_session().send(command)
             return True
         except Exception as e:
-            print(f"Error sending command: {e}")
+            logger.error("Error sending command: %s", e)
+            self.last_error = str(e) or type(e).__name__
             return False
             
-    def read_response(self) -> Optional[str]:
+    def read_response(self, timeout: float = 1.0) -> Optional[str]:
         try:
             if self.serial_port:
-                # Esperar un momento para que llegue la respuesta
-                time.sleep(0.2)
-                if self.serial_port.in_waiting:
-                    response = self.serial_port.readline().decode().strip()
-                    print(f"Raw response from serial port: {response}")
+                # Devuelve en cuanto el hilo lector recibe una línea completa
+                response = self.serial_port.read_line(timeout)
+                if response is not None:
+                    logger.debug("Raw response from serial port: %s", response)
                     return response
                 else:
-                    print("No data available in serial port")
+                    logger.debug("No data available in serial port")
             elif self.network_device:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(1)
-                sock.connect((self.network_device.ip, self.network_device.port))
-                response = sock.recv(1024).decode().strip()
-                print(f"Raw response from network device: {response}")
-                sock.close()
+                response = self._tcp_session().read_line(timeout)
+                logger.debug("Raw response from network device: %s", response)
                 return response
         except Exception as e:
-            print(f"Error reading response: {e}")
+            logger.error("Error reading response: %s", e)
         return None
         
+    def request(self, command: str, timeout: float = 1.0) -> Optional[str]:
+        """Envía un comando y devuelve su respuesta, o None si no llega."""
+        if self.serial_port:
+            if self.send_command(command):
+                return self.read_response(timeout)
+            return None
+        if self.network_device:
+            try:
+                return self._tcp_session().request(command, timeout)
+            except Exception as e:
+                logger.error("Error sending command to %s: %s", self.network_device.ip, e)
+        return None
+
+    def _tcp_session(self):
+        return self.tcp_pool.get(self.network_device.ip, self.network_device.port)
+
     def configure_wifi(self, ssid: str, password: str, btc_address: str = None) -> bool:
         """Configura la conexión WiFi del dispositivo usando el protocolo JSON."""
         try:
-            print(f"Configurando WiFi para SSID: {ssid}")
+            logger.info("Configurando WiFi para SSID: %s", ssid)
             # Crear el objeto JSON de configuración
             config = {
                 "ssid": ssid,
@@ -278,133 +569,135 @@ class NMDevice:
 
             # Convertir a JSON y enviar
             json_config = json.dumps(config)
-            if self.send_command(json_config):
-                response = self.read_response()
-                print(f"WiFi config response: {response}")
-                if response and ("Save Wifi SSID" in response or "Save Wifi Password" in response):
-                    return True
+            if self.serial_port:
+                matched, lines = self.serial_port.request(
+                    json_config,
+                    lambda line: "Save Wifi SSID" in line or "Save Wifi Password" in line,
+                    timeout=3.0)
+                logger.debug("WiFi config response: %s", lines)
+                return matched
+            response = self.request(json_config)
+            logger.debug("WiFi config response: %s", response)
+            if response and ("Save Wifi SSID" in response or "Save Wifi Password" in response):
+                return True
             return False
         except Exception as e:
-            print(f"Error configuring WiFi: {e}")
+            logger.error("Error configuring WiFi: %s", e)
             return False
 
     def get_wifi_status(self) -> Optional[Dict]:
         """Obtiene el estado de la configuración WiFi."""
         try:
-            if self.send_command("status"):
-                response = self.read_response()
-                print(f"WiFi status response: {response}")
-                if response:
-                    if "WiFi configuration time left:" in response:
-                        time_left = response.split("time left:")[1].strip().replace("s", "")
-                        return {
-                            "status": "configuring",
-                            "time_left": int(time_left)
-                        }
-                    elif "Connected to" in response:
-                        return {
-                            "status": "connected",
-                            "ssid": response.split("Connected to")[1].strip()
-                        }
+            response = self.request("status")
+            logger.debug("WiFi status response: %s", response)
+            if response:
+                if "WiFi configuration time left:" in response:
+                    time_left = response.split("time left:")[1].strip().replace("s", "")
+                    return {
+                        "status": "configuring",
+                        "time_left": int(time_left)
+                    }
+                elif "Connected to" in response:
+                    return {
+                        "status": "connected",
+                        "ssid": response.split("Connected to")[1].strip()
+                    }
             return None
         except Exception as e:
-            print(f"Error getting WiFi status: {e}")
+            logger.error("Error getting WiFi status: %s", e)
             return None
         
     def get_config(self) -> Optional[Dict]:
         """Obtiene la configuración del dispositivo."""
         try:
-            print("Sending get_config command...")
+            logger.debug("Sending get_config command...")
             # Intentar primero con el comando de estado
-            if self.send_command("status"):
-                response = self.read_response()
-                print(f"Status response received: {response}")
-                if response:
-                    # Si estamos en modo de configuración WiFi
-                    if "WiFi configuration time left:" in response:
-                        time_left = response.split("time left:")[1].strip().replace("s", "")
-                        return {
-                            "wifi_config_time": int(time_left),
-                            "status": "configuring"
-                        }
-                    # Si recibimos el MD5 del firmware
-                    elif "NMMiner Firmware md5" in response:
-                        md5 = response.split("[")[1].split("]")[0]
-                        return {
-                            "firmware_md5": md5,
-                            "status": "initializing"
-                        }
-                    # Si está intentando conectarse
-                    elif "Try to connect" in response:
-                        return {
-                            "status": "connecting",
-                            "message": response
-                        }
-            
-            # Intentar con el comando de configuración
-            if self.send_command("config"):
-                response = self.read_response()
-                print(f"Config response received: {response}")
-                if response:
+            response = self.request("status")
+            logger.debug("Status response received: %s", response)
+            if response:
+                # Si estamos en modo de configuración WiFi
+                if "WiFi configuration time left:" in response:
+                    time_left = response.split("time left:")[1].strip().replace("s", "")
                     return {
-                        "status": "configuring",
+                        "wifi_config_time": int(time_left),
+                        "status": "configuring"
+                    }
+                # Si recibimos el MD5 del firmware
+                elif "NMMiner Firmware md5" in response:
+                    md5 = response.split("[")[1].split("]")[0]
+                    return {
+                        "firmware_md5": md5,
+                        "status": "initializing"
+                    }
+                # Si está intentando conectarse
+                elif "Try to connect" in response:
+                    return {
+                        "status": "connecting",
                         "message": response
                     }
             
+            # Intentar con el comando de configuración
+            response = self.request("config")
+            logger.debug("Config response received: %s", response)
+            if response:
+                return {
+                    "status": "configuring",
+                    "message": response
+                }
+            
             return None
         except Exception as e:
-            print(f"Error getting config: {e}")
+            logger.error("Error getting config: %s", e)
             return None
         
     def get_status(self) -> DeviceStatus:
-        print("Sending status command...")
-        if self.send_command("status"):
-            response = self.read_response()
-            print(f"Status response received: {response}")
-            if response:
-                try:
-                    # Si estamos en modo de configuración WiFi
-                    if "WiFi configuration time left:" in response:
-                        self.status = DeviceStatus(
-                            device_id="NM Device (WiFi Config Mode)",
-                            hash_rate=0.0,
-                            temperature=0.0,
-                            fan_speed=0,
-                            is_mining=False
-                        )
-                    # Si está inicializando
-                    elif "NMMiner Firmware md5" in response:
-                        self.status = DeviceStatus(
-                            device_id="NM Device (Initializing)",
-                            hash_rate=0.0,
-                            temperature=0.0,
-                            fan_speed=0,
-                            is_mining=False
-                        )
-                    # Si está intentando conectarse
-                    elif "Try to connect" in response:
-                        self.status = DeviceStatus(
-                            device_id="NM Device (Connecting)",
-                            hash_rate=0.0,
-                            temperature=0.0,
-                            fan_speed=0,
-                            is_mining=False
-                        )
-                    else:
-                        # Por ahora, devolvemos un estado básico
-                        self.status = DeviceStatus(
-                            device_id="NM Device",
-                            hash_rate=0.0,
-                            temperature=0.0,
-                            fan_speed=0,
-                            is_mining=False
-                        )
-                except Exception as e:
-                    print(f"Error processing status: {e}")
-                    self.status.error = str(e)
-            else:
-                print("No response received for status command")
-                self.status.error = "No response"
+        logger.debug("Sending status command...")
+        response = self.request("status")
+        logger.debug("Status response received: %s", response)
+        if response:
+            try:
+                # Si estamos en modo de configuración WiFi
+                if "WiFi configuration time left:" in response:
+                    self.status = DeviceStatus(
+                        device_id="NM Device (WiFi Config Mode)",
+                        hash_rate=0.0,
+                        temperature=0.0,
+                        fan_speed=0,
+                        is_mining=False
+                    )
+                # Si está inicializando
+                elif "NMMiner Firmware md5" in response:
+                    self.status = DeviceStatus(
+                        device_id="NM Device (Initializing)",
+                        hash_rate=0.0,
+                        temperature=0.0,
+                        fan_speed=0,
+                        is_mining=False
+                    )
+                # Si está intentando conectarse
+                elif "Try to connect" in response:
+                    self.status = DeviceStatus(
+                        device_id="NM Device (Connecting)",
+                        hash_rate=0.0,
+                        temperature=0.0,
+                        fan_speed=0,
+                        is_mining=False
+                    )
+                else:
+                    # Por ahora, devolvemos un estado básico
+                    self.status = DeviceStatus(
+                        device_id="NM Device",
+                        hash_rate=0.0,
+                        temperature=0.0,
+                        fan_speed=0,
+                        is_mining=False
+                    )
+            except Exception as e:
+                logger.error("Error processing status: %s", e)
+                self.status.error = str(e)
+        else:
+            logger.warning("No response received for status command")
+            self.status.error = "No response"
         return self.status
         
     def start_mining(self) -> bool:
@@ -416,6 +709,7 @@ class NMDevice:
     def set_fan_speed(self, speed: int) -> bool:
         if 0 <= speed <= 100:
             return self.send_command(f"fan {speed}")
+        self.last_error = f"invalid fan speed {speed}"
         return False
         
     def reboot(self) -> bool:
@@ -0,0 +1,232 @@
+import json
+import socket
+import ipaddress
+import selectors
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+STATUS_PORT = 12345  # Puerto donde los dispositivos difunden su estado
+CONFIG_PORT = 12346  # Puerto donde los dispositivos devuelven su configuración
+
+# Buffer de recepción pedido al núcleo: absorbe ráfagas de cientos de equipos
+RCVBUF_SIZE = 4 * 1024 * 1024
+MAX_DATAGRAM = 65535
+
+
+def set_receive_buffer(sock: socket.socket, size: int = RCVBUF_SIZE) -> int:
+    """Pide ``size`` bytes de SO_RCVBUF y devuelve el tamaño concedido.
+
+    En Linux el valor queda limitado por ``net.core.rmem_max``.
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+    except OSError:
+        pass
+    return sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+
+def udp_drops(ports) -> Dict[int, int]:
+    """Datagramas descartados por el núcleo en los sockets UDP de ``ports``.
+
+    Lee la columna ``drops`` de ``/proc/net/udp`` (solo Linux) y suma todos
+    los sockets de cada puerto. Sin ``/proc`` devuelve un diccionario vacío.
+    """
+    ports = set(ports)
+    drops: Dict[int, int] = {}
+    try:
+        with open('/proc/net/udp') as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                port = int(fields[1].split(':')[1], 16)
+                if port in ports:
+                    drops[port] = drops.get(port, 0) + int(fields[12])
+    except (OSError, IndexError, ValueError):
+        return {}
+    return drops
+
+
+class UDPListener:
+    """Escucha los puertos de estado y configuración en un único hilo.
+
+    Usa ``selectors`` para despertar solo cuando algún socket tiene datos y,
+    en cada despertar, vacía todos los datagramas pendientes de ese socket.
+    Con ``networks`` solo se atienden los paquetes cuyo origen está en alguna
+    de esas subredes (p. ej. las de las interfaces de las VLAN de mineros).
+    Los datagramas se leen con ``recvfrom_into`` sobre un buffer reutilizado.
+    """
+
+    def __init__(self,
+                 on_status: Callable[[str, dict], None],
+                 on_config: Callable[[dict, tuple], None],
+                 on_error: Optional[Callable[[str], None]] = None,
+                 host: str = '0.0.0.0',
+                 status_port: int = STATUS_PORT,
+                 config_port: int = CONFIG_PORT,
+                 networks: Optional[List[ipaddress.IPv4Network]] = None,
+                 rcvbuf: int = RCVBUF_SIZE):
+        self.on_status = on_status
+        self.on_config = on_config
+        self.on_error = on_error
+        self.host = host
+        self.status_port = status_port
+        self.config_port = config_port
+        self.rcvbuf = rcvbuf
+        self.buffer_sizes: Dict[int, int] = {}  # Puerto -> SO_RCVBUF concedido
+        self._reported_drops = 0
+        self.received = 0  # Datagramas leídos de los sockets
+        self.filtered = 0  # Paquetes descartados por venir de otra subred
+        self.set_networks(networks)
+        self._selector = None
+        self._thread = None
+        self._running = False
+        self._wake_r = None
+        self._wake_w = None
+        self._buffer = bytearray(MAX_DATAGRAM)  # Reutilizado en cada lectura
+
+    def start(self):
+        """Abre los sockets y arranca el hilo de escucha.
+
+        Si un puerto no se puede abrir (p. ej. ya lo usa ``nm_daemon``) se
+        cierra lo abierto hasta entonces y se relanza el ``OSError``.
+        """
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        try:
+            self._register(self.config_port, self._handle_config)
+            self._register(self.status_port, self._handle_status)
+        except OSError:
+            self._close()
+            raise
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """Detiene el hilo de escucha y cierra los sockets."""
+        self._running = False
+        wake = self._wake_w
+        if wake:
+            try:
+                wake.send(b'\0')
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def kernel_drops(self) -> Dict[int, int]:
+        """Descartes del núcleo por puerto (vacío si no hay ``/proc/net/udp``)."""
+        return udp_drops((self.status_port, self.config_port))
+
+    def new_kernel_drops(self) -> int:
+        """Descartes del núcleo desde la última llamada."""
+        total = sum(self.kernel_drops().values())
+        new, self._reported_drops = total - self._reported_drops, total
+        return max(new, 0)
+
+    def buffer_summary(self) -> str:
+        """Texto con el SO_RCVBUF concedido, avisando si es menor que el pedido."""
+        granted = min(self.buffer_sizes.values(), default=0)
+        text = f"UDP receive buffer: {granted // 1024} KiB"
+        if granted < self.rcvbuf:
+            text += (f" (requested {self.rcvbuf // 1024} KiB; "
+                     f"raise net.core.rmem_max to avoid drops in bursts)")
+        return text
+
+    @property
+    def networks(self) -> Optional[Tuple[ipaddress.IPv4Network, ...]]:
+        source_filter = self._filter
+        return source_filter[0] if source_filter else None
+
+    def set_networks(self, networks: Optional[List[ipaddress.IPv4Network]]):
+        """Cambia las subredes atendidas (None = todas). Se puede llamar en marcha.
+
+        Las subredes y su caché se sustituyen en una sola asignación, así que el
+        hilo de escucha nunca ve una mitad nueva y otra vieja.
+        """
+        # Resultado por IP de origen: la flota es finita, cada IP se evalúa una vez
+        self._filter = (tuple(networks), {}) if networks else None
+
+    def _source_allowed(self, ip: str) -> bool:
+        source_filter = self._filter
+        return source_filter is None or self._check_source(source_filter, ip)
+
+    @staticmethod
+    def _check_source(source_filter, ip: str) -> bool:
+        networks, allowed_by_ip = source_filter
+        allowed = allowed_by_ip.get(ip)
+        if allowed is None:
+            address = ipaddress.IPv4Address(ip)
+            allowed = any(address in network for network in networks)
+            allowed_by_ip[ip] = allowed
+        return allowed
+
+    def _register(self, port: int, handler: Callable[[bytes, tuple], None]):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.buffer_sizes[port] = set_receive_buffer(sock, self.rcvbuf)
+            sock.bind((self.host, port))
+            sock.setblocking(False)
+            self._selector.register(sock, selectors.EVENT_READ, handler)
+        except OSError:
+            sock.close()
+            raise
+
+    def _run(self):
+        try:
+            while self._running:
+                for key, _ in self._selector.select():
+                    if key.data is None:
+                        # Socket de despertar: solo sirve para salir de select()
+                        try:
+                            key.fileobj.recv(64)
+                        except OSError:
+                            pass
+                        continue
+                    self._drain(key.fileobj, key.data)
+        finally:
+            self._close()
+
+    def _drain(self, sock: socket.socket, handler: Callable[[bytes, tuple], None]):
+        """Lee todos los datagramas en cola del socket hasta que no quede ninguno."""
+        buffer = self._buffer
+        while True:
+            try:
+                size, addr = sock.recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                self._report(f"Listener error: {str(e)}")
+                return
+            self.received += 1
+            try:
+                source_filter = self._filter  # Una sola lectura por datagrama
+                if source_filter is not None and not self._check_source(source_filter, addr[0]):
+                    self.filtered += 1
+                    continue
+                handler(buffer[:size], addr)
+            except Exception as e:
+                self._report(f"Listener error: {str(e)}")
+
+    def _handle_config(self, data: bytes, addr: tuple):
+        config = json.loads(data.decode('utf-8'))
+        self.on_config(config, addr)
+
+    def _handle_status(self, data: bytes, addr: tuple):
+        status = json.loads(data.decode('utf-8'))
+        self.on_status(addr[0], status)
+
+    def _report(self, message: str):
+        if self.on_error:
+            self.on_error(message)
+
+    def _close(self):
+        for key in list(self._selector.get_map().values()):
+            self._selector.unregister(key.fileobj)
+            key.fileobj.close()
+        self._selector.close()
+        self._wake_w.close()
+        self._selector = self._wake_r = self._wake_w = None
@@ -0,0 +1,96 @@
+import re
+import math
+from typing import Optional, Tuple
+
+# Prefijos SI usados por el firmware en hash rate y dificultades
+SI_PREFIXES = {'': 1.0, 'k': 1e3, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'P': 1e15, 'E': 1e18}
+
+_NUMBER_WITH_PREFIX = re.compile(r'\s*([-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)\s*([kKMGTPE]?)')
+_UPTIME = re.compile(r'\s*(?:(\d+)\s*d)?\s*(\d+):(\d{1,2}):(\d{1,2})')
+
+# Límite de las columnas int64; el mínimo queda libre como marca de desconocido
+INT64_MAX = 2 ** 63 - 1
+
+
+def to_float(value, default: float = 0.0) -> float:
+    """Convierte un valor numérico o texto a float, con valor por defecto."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def to_int(value, default: Optional[int] = 0) -> Optional[int]:
+    """Convierte a int acotado al rango de int64; ``default`` si no es finito."""
+    if isinstance(value, int):
+        if -INT64_MAX <= value <= INT64_MAX:
+            return value
+    else:
+        value = to_float(value, None)
+        if value is None or not math.isfinite(value):
+            return default
+    return max(-INT64_MAX, min(INT64_MAX, int(value)))
+
+
+def parse_si_number(value) -> float:
+    """Convierte textos como ``"1.02M"`` o ``"110.57T"`` a su valor absoluto."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_WITH_PREFIX.match(value or '')
+    if not match:
+        return 0.0
+    return float(match.group(1)) * SI_PREFIXES[match.group(2)]
+
+
+def parse_hash_rate(value) -> float:
+    """Convierte un hash rate como ``"1021.46KH/s"`` a H/s."""
+    return parse_si_number(value)
+
+
+def format_hash_rate(hashes_per_second: float) -> str:
+    """Formatea H/s con el prefijo SI adecuado, p. ej. ``"12.34 MH/s"``."""
+    for prefix in ('E', 'P', 'T', 'G', 'M', 'K'):
+        scale = SI_PREFIXES[prefix]
+        if hashes_per_second >= scale:
+            return f"{hashes_per_second / scale:.2f} {prefix}H/s"
+    return f"{hashes_per_second:.2f} H/s"
+
+
+def parse_share(value) -> Tuple[int, int]:
+    """Convierte ``"aceptadas/rechazadas[/...]"`` en ``(aceptadas, rechazadas)``."""
+    parts = str(value or '').split('/')
+    accepted = to_int(parts[0]) if parts else 0
+    rejected = to_int(parts[1]) if len(parts) > 1 else 0
+    return accepted, rejected
+
+
+def parse_uptime(value) -> Optional[int]:
+    """Convierte un uptime como ``"2d 03:04:05"`` a segundos.
+
+    Devuelve None si el texto no es un uptime ni un número de segundos.
+    """
+    match = _UPTIME.match(value) if isinstance(value, str) else None
+    if not match:
+        return to_int(value, None)
+    days, hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return to_int(((days * 24 + hours) * 60 + minutes) * 60 + seconds, None)
+
+
+def format_uptime(seconds: int) -> str:
+    """Formatea segundos de uptime como ``"Nd HH:MM:SS"``."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+# Campo en texto de NetworkDevice -> conversor a sus campos numéricos
+PARSED_FIELDS = {
+    'hash_rate': lambda v: (('hash_rate_hs', parse_hash_rate(v)),),
+    'net_diff': lambda v: (('net_diff_value', parse_si_number(v)),),
+    'pool_diff': lambda v: (('pool_diff_value', parse_si_number(v)),),
+    'last_diff': lambda v: (('last_diff_value', parse_si_number(v)),),
+    'best_diff': lambda v: (('best_diff_value', parse_si_number(v)),),
+    'share': lambda v: tuple(zip(('shares_accepted', 'shares_rejected'), parse_share(v))),
+    'uptime': lambda v: (('uptime_seconds', parse_uptime(v)),),
+}
@@ -0,0 +1,119 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                            QLineEdit, QPushButton, QSpinBox, QGroupBox,
+                            QFormLayout, QMessageBox, QTableWidget,
+                            QTableWidgetItem, QHeaderView)
+from PySide6.QtCore import Qt, Signal
+import threading
+import time
+from provisioning import ProvisioningStation
+
+
+class ProvisionWindow(QDialog):
+    """Provisiona en paralelo varias placas conectadas por USB."""
+
+    progress_signal = Signal(str, str, str)
+    finished_signal = Signal(list, float)
+
+    def __init__(self, ports, ssid="", password="", btc="", busy_ports=(), parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Provision Serial Ports")
+        self.setMinimumSize(600, 400)
+        self.parent = parent
+        self.ports = list(ports)
+        self.busy_ports = set(busy_ports)
+        self._rows = {}
+        self.setup_ui(ssid, password, btc)
+        self.progress_signal.connect(self.update_progress)
+        self.finished_signal.connect(self.provisioning_finished)
+
+    def setup_ui(self, ssid, password, btc):
+        layout = QVBoxLayout(self)
+
+        group = QGroupBox("WiFi Configuration")
+        form = QFormLayout()
+        self.ssid_input = QLineEdit(ssid)
+        form.addRow("SSID:", self.ssid_input)
+        self.password_input = QLineEdit(password)
+        self.password_input.setEchoMode(QLineEdit.EchoMode.Password)
+        form.addRow("Password:", self.password_input)
+        self.btc_input = QLineEdit(btc)
+        form.addRow("BTC:", self.btc_input)
+        self.workers = QSpinBox()
+        self.workers.setRange(1, 64)
+        self.workers.setValue(16)
+        form.addRow("Parallel ports:", self.workers)
+        group.setLayout(form)
+        layout.addWidget(group)
+
+        # Tabla de puertos: selección y estado de cada uno
+        self.port_table = QTableWidget(len(self.ports), 3)
+        self.port_table.setHorizontalHeaderLabels(["Port", "Status", "Message"])
+        self.port_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        for row, port in enumerate(self.ports):
+            item = QTableWidgetItem(port)
+            item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+            # El puerto abierto en la ventana principal no se puede volver a abrir
+            in_use = port in self.busy_ports
+            item.setCheckState(Qt.CheckState.Unchecked if in_use else Qt.CheckState.Checked)
+            self.port_table.setItem(row, 0, item)
+            self.port_table.setItem(row, 1, QTableWidgetItem("in use" if in_use else ""))
+            self.port_table.setItem(row, 2, QTableWidgetItem(""))
+            self._rows[port] = row
+        layout.addWidget(self.port_table)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+        button_layout = QHBoxLayout()
+        self.start_button = QPushButton("Provision")
+        self.start_button.clicked.connect(self.start_provisioning)
+        button_layout.addWidget(self.start_button)
+        self.close_button = QPushButton("Close")
+        self.close_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+
+    def selected_ports(self):
+        return [port for port, row in self._rows.items()
+                if self.port_table.item(row, 0).checkState() == Qt.CheckState.Checked]
+
+    def start_provisioning(self):
+        ports = self.selected_ports()
+        ssid = self.ssid_input.text().strip()
+        password = self.password_input.text().strip()
+        if not ports:
+            QMessageBox.warning(self, "Provisioning", "Select at least one port")
+            return
+        if not ssid or not password:
+            QMessageBox.warning(self, "Configuration Error", "SSID and Password are required")
+            return
+
+        self.start_button.setEnabled(False)
+        self.close_button.setEnabled(False)
+        for port in ports:
+            self.update_progress(port, "queued", "")
+        station = ProvisioningStation(max_workers=self.workers.value())
+        btc = self.btc_input.text().strip()
+
+        def run():
+            start = time.monotonic()
+            results = station.provision(ports, ssid, password, btc, self.progress_signal.emit)
+            self.finished_signal.emit(results, time.monotonic() - start)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def update_progress(self, port, state, message):
+        row = self._rows[port]
+        self.port_table.item(row, 1).setText(state)
+        self.port_table.item(row, 2).setText(message)
+
+    def provisioning_finished(self, results, elapsed):
+        ok = sum(1 for result in results if result.success)
+        self.summary_label.setText(
+            f"{ok}/{len(results)} ports configured in {elapsed:.1f} s")
+        if hasattr(self.parent, 'log'):
+            for result in results:
+                status = "OK" if result.success else f"FAILED {result.error or ''}".strip()
+                self.parent.log(f"Provisioning {result.port}: {status}")
+        self.start_button.setEnabled(True)
+        self.close_button.setEnabled(True)
@@ -0,0 +1,67 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+from serial_session import SerialSession
+
+logger = logging.getLogger('provisioning')
+
+
+@dataclass
+class ProvisionResult:
+    port: str
+    success: bool
+    lines: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+class ProvisioningStation:
+    """Envía la configuración WiFi a varias placas por USB en paralelo.
+
+    Cada puerto se abre en un hilo del pool, se le envía el JSON con SSID,
+    contraseña y dirección BTC, y se espera la confirmación del firmware.
+    ``on_progress(puerto, estado, mensaje)`` se llama desde los hilos del pool.
+    """
+
+    def __init__(self, max_workers: int = 16, baud_rate: int = 115200,
+                 timeout: float = 5.0):
+        self.max_workers = max_workers
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+
+    def provision(self, ports: List[str], ssid: str, password: str, btc: str = "",
+                  on_progress: Optional[Callable[[str, str, str], None]] = None
+                  ) -> List[ProvisionResult]:
+        """Provisiona todos los ``ports`` y devuelve un resultado por puerto."""
+        config = {"ssid": ssid, "password": password}
+        if btc:
+            config["btc"] = btc
+        payload = json.dumps(config)
+        progress = on_progress or (lambda port, state, message: None)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(ports)))) as pool:
+            return list(pool.map(lambda port: self._provision_port(port, payload, progress),
+                                 ports))
+
+    def _provision_port(self, port: str, payload: str, progress) -> ProvisionResult:
+        import serial
+
+        session = None
+        try:
+            progress(port, "opening", "")
+            session = SerialSession(serial.Serial(port, self.baud_rate, timeout=0.2))
+            progress(port, "sending", "")
+            matched, lines = session.request(payload, "Save Wifi SSID", "Save Wifi Password",
+                                             timeout=self.timeout)
+            if matched:
+                progress(port, "done", "WiFi configuration saved")
+            else:
+                progress(port, "failed", "No confirmation from device")
+            return ProvisionResult(port, matched, lines)
+        except Exception as e:
+            logger.error("Error provisioning %s: %s", port, e)
+            progress(port, "failed", str(e))
+            return ProvisionResult(port, False, error=str(e))
+        finally:
+            if session:
+                session.close()
@@ -0,0 +1,141 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                            QPushButton, QSpinBox, QDoubleSpinBox, QGroupBox,
+                            QFormLayout, QMessageBox, QTableWidget,
+                            QTableWidgetItem, QHeaderView)
+from PySide6.QtCore import Qt, Signal
+import threading
+from config_rollout import ConfigRollout, common_values, missing_credentials, plan_rollout
+
+
+class RolloutWindow(QDialog):
+    """Aplica los campos marcados a todos los dispositivos que difieren."""
+
+    progress_signal = Signal(int, int, int, int)
+    finished_signal = Signal(dict)
+
+    def __init__(self, configs, pusher, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Fleet Config Rollout")
+        self.setMinimumSize(600, 500)
+        self.parent = parent
+        self.configs = dict(configs)
+        self.pusher = pusher
+        self.rollout = None
+        self._defaults = common_values(self.configs)
+        self.setup_ui()
+        self.progress_signal.connect(self.update_progress)
+        self.finished_signal.connect(self.rollout_finished)
+        self.update_preview()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        # Un campo por fila, con el valor más frecuente de la flota como punto de partida
+        self.field_table = QTableWidget(len(self._defaults), 2)
+        self.field_table.setHorizontalHeaderLabels(["Field", "Value"])
+        self.field_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        for row, (key, value) in enumerate(sorted(self._defaults.items())):
+            item = QTableWidgetItem(key)
+            item.setFlags(Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled)
+            item.setCheckState(Qt.CheckState.Unchecked)
+            self.field_table.setItem(row, 0, item)
+            self.field_table.setItem(row, 1, QTableWidgetItem(str(value)))
+        self.field_table.itemChanged.connect(self.update_preview)
+        layout.addWidget(self.field_table)
+
+        group = QGroupBox("Rollout")
+        form = QFormLayout()
+        self.wave_size = QSpinBox()
+        self.wave_size.setRange(1, 500)
+        self.wave_size.setValue(20)
+        form.addRow("Devices per wave:", self.wave_size)
+        self.wave_interval = QDoubleSpinBox()
+        self.wave_interval.setRange(0.0, 60.0)
+        self.wave_interval.setValue(2.0)
+        form.addRow("Seconds between waves:", self.wave_interval)
+        group.setLayout(form)
+        layout.addWidget(group)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+        button_layout = QHBoxLayout()
+        self.start_button = QPushButton("Roll Out")
+        self.start_button.clicked.connect(self.start_rollout)
+        button_layout.addWidget(self.start_button)
+        self.close_button = QPushButton("Close")
+        self.close_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+
+    def template(self):
+        """Campos marcados, convertidos al tipo que tienen en la flota."""
+        template = {}
+        for row in range(self.field_table.rowCount()):
+            item = self.field_table.item(row, 0)
+            if item.checkState() != Qt.CheckState.Checked:
+                continue
+            key = item.text()
+            text = self.field_table.item(row, 1).text().strip()
+            default = self._defaults[key]
+            if isinstance(default, bool):
+                template[key] = text.lower() in ('true', '1', 'yes')
+            elif isinstance(default, int):
+                template[key] = int(text)
+            elif isinstance(default, float):
+                template[key] = float(text)
+            else:
+                template[key] = text
+        return template
+
+    def update_preview(self, *args):
+        try:
+            plan = plan_rollout(self.template(), self.configs)
+        except ValueError as e:
+            self.summary_label.setText(f"Invalid value: {e}")
+            return
+        skipped = sum(1 for config in self.configs.values() if missing_credentials(config))
+        self.summary_label.setText(
+            f"{len(plan)} of {len(self.configs)} devices need changes"
+            + (f" ({skipped} skipped: no WiFi credentials in their config)" if skipped else ""))
+
+    def start_rollout(self):
+        try:
+            plan = plan_rollout(self.template(), self.configs)
+        except ValueError as e:
+            QMessageBox.warning(self, "Configuration Error", f"Invalid value: {e}")
+            return
+        if not plan:
+            QMessageBox.information(self, "Rollout", "All devices already match")
+            return
+
+        self.start_button.setEnabled(False)
+        self.field_table.setEnabled(False)
+        self.rollout = ConfigRollout(self.pusher, self.wave_size.value(),
+                                     self.wave_interval.value())
+        if hasattr(self.parent, 'log'):
+            self.parent.log(f"Rolling out {len(plan)} configurations "
+                            f"in waves of {self.wave_size.value()}")
+
+        def run():
+            self.finished_signal.emit(self.rollout.run(plan, self.progress_signal.emit))
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def update_progress(self, done, total, confirmed, failed):
+        self.summary_label.setText(
+            f"{done}/{total} devices: {confirmed} confirmed, {failed} failed")
+
+    def rollout_finished(self, results):
+        confirmed = sum(1 for state in results.values() if state == "confirmed")
+        if hasattr(self.parent, 'log'):
+            self.parent.log(f"Rollout finished: {confirmed}/{len(results)} confirmed")
+        self.start_button.setEnabled(True)
+        self.field_table.setEnabled(True)
+        self.rollout = None
+
+    def reject(self):
+        # Cerrar la ventana detiene la rollout tras la oleada en curso
+        if self.rollout:
+            self.rollout.cancel()
+        super().reject()
@@ -0,0 +1,109 @@
+import re
+import queue
+import logging
+import threading
+import time
+from typing import Callable, List, Tuple, Union
+
+logger = logging.getLogger('serial_session')
+
+# Secuencias de escape ANSI (colores) que el firmware añade a sus mensajes
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+Pattern = Union[str, Callable[[str], bool]]
+
+
+class SerialSession:
+    """Sesión sobre un puerto serie con un hilo lector dedicado.
+
+    El hilo lee líneas completas, elimina los códigos ANSI una sola vez y las
+    deja en una cola. ``request`` envía un comando y espera solo hasta que
+    llegan las líneas que se esperan, en lugar de dormir un tiempo fijo.
+    """
+
+    def __init__(self, port):
+        self.port = port
+        self._lines = queue.Queue()
+        self._running = True
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    @property
+    def name(self) -> str:
+        return getattr(self.port, 'port', '') or ''
+
+    def close(self):
+        """Detiene el hilo lector y cierra el puerto."""
+        self._running = False
+        try:
+            self.port.close()
+        except Exception as e:
+            logger.debug("Error closing %s: %s", self.name, e)
+        self._thread.join(timeout=2)
+
+    def write_line(self, text: str):
+        with self._write_lock:
+            self.port.write(f"{text}\r\n".encode())
+            self.port.flush()
+
+    def read_line(self, timeout: float = 1.0):
+        """Devuelve la siguiente línea recibida o None si no llega a tiempo."""
+        try:
+            return self._lines.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def discard_pending(self) -> List[str]:
+        """Descarta (y devuelve) las líneas recibidas antes de un nuevo comando."""
+        stale = []
+        while True:
+            try:
+                stale.append(self._lines.get_nowait())
+            except queue.Empty:
+                return stale
+
+    def request(self, command: str, *patterns: Pattern,
+                timeout: float = 2.0) -> Tuple[bool, List[str]]:
+        """Envía ``command`` y recoge líneas hasta ver todos los ``patterns``.
+
+        Cada patrón es un texto que debe aparecer en alguna línea o una función
+        que recibe la línea. Sin patrones, termina con la primera línea.
+        Devuelve ``(completado, líneas)``.
+        """
+        self.discard_pending()
+        self.write_line(command)
+        pending = list(patterns)
+        lines = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False, lines
+            line = self.read_line(remaining)
+            if line is None:
+                return False, lines
+            lines.append(line)
+            pending = [p for p in pending if not self._matches(p, line)]
+            if not pending:
+                return True, lines
+
+    @staticmethod
+    def _matches(pattern: Pattern, line: str) -> bool:
+        return pattern(line) if callable(pattern) else pattern in line
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                raw = self.port.readline()
+            except Exception as e:
+                if self._running:
+                    logger.error("Error reading %s: %s", self.name, e)
+                    time.sleep(0.5)
+                continue
+            if not raw:
+                continue
+            line = ANSI_ESCAPE.sub('', raw.decode(errors='replace')).strip()
+            if line:
+                logger.debug("%s: %s", self.name, line)
+                self._lines.put(line)
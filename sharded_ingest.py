@@ -0,0 +1,262 @@
+"""Ingesta de estados repartida entre varios procesos.
+
+Cada proceso trabajador abre los puertos de estado y configuración con
+``SO_REUSEPORT``, decodifica los paquetes y envía al proceso principal lotes
+compactos por una tubería. Solo está disponible en Linux, donde el núcleo
+reparte los datagramas unicast entre los sockets del grupo.
+
+Los broadcast no se reparten: el núcleo entrega una copia a cada socket del
+grupo, así que cada trabajador los recibe todos y descarta los de los
+orígenes que no le tocan. Con tráfico broadcast solo se reparte el
+decodificado; la lectura del socket se repite en cada proceso.
+"""
+import sys
+import json
+import time
+import socket
+import struct
+import selectors
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from typing import Dict, List, Tuple
+from nm_device import STATUS_FIELDS
+from nm_listener import UDPListener, MAX_DATAGRAM, set_receive_buffer
+
+SHARDING_SUPPORTED = sys.platform.startswith('linux') and hasattr(socket, 'SO_REUSEPORT')
+
+# Linux: IP_PKTINFO da la dirección de destino de cada datagrama
+IP_PKTINFO = getattr(socket, 'IP_PKTINFO', 8)
+PKTINFO_SIZE = struct.calcsize('i4s4s')
+
+STATUS, CONFIG = 0, 1
+
+
+def _open_socket(host: str, port: int, rcvbuf: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    set_receive_buffer(sock, rcvbuf)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.setsockopt(socket.IPPROTO_IP, IP_PKTINFO, 1)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    return sock
+
+
+def _is_broadcast(ancdata) -> bool:
+    """True si el datagrama no iba dirigido a una dirección local.
+
+    En ``in_pktinfo`` el núcleo pone como ``ipi_spec_dst`` el propio destino
+    de los paquetes unicast locales y la dirección de la interfaz en los
+    broadcast, así que no hace falta conocer las subredes (ni seguir sus
+    cambios, p. ej. una VLAN nueva).
+    """
+    for level, kind, data in ancdata:
+        if level == socket.IPPROTO_IP and kind == IP_PKTINFO and len(data) >= PKTINFO_SIZE:
+            _, local, destination = struct.unpack('i4s4s', data[:PKTINFO_SIZE])
+            return local != destination
+    return False
+
+
+def _worker(index: int, count: int, host: str, ports: Tuple[int, int], conn, stop,
+            batch_size: int, flush_interval: float, rcvbuf: int, coalesce: bool):
+    """Bucle de un proceso trabajador."""
+    selector = selectors.DefaultSelector()
+    sizes = {}
+    for kind, port in zip((STATUS, CONFIG), ports):
+        sock = _open_socket(host, port, rcvbuf)
+        sizes[port] = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        selector.register(sock, selectors.EVENT_READ, kind)
+    conn.send(sizes)  # Sockets abiertos
+    buffer = bytearray(MAX_DATAGRAM)
+    ancbufsize = socket.CMSG_SPACE(PKTINFO_SIZE)
+
+    statuses: Dict[str, dict] = {}
+    updates: List[Tuple[str, dict]] = []  # Sin fusionar (coalesce=False)
+    configs: List[Tuple[dict, tuple]] = []
+    errors = received = 0
+    last_flush = time.monotonic()
+    stopping = False
+    while not stopping:
+        stopping = stop.is_set()  # Una última vuelta para enviar lo pendiente
+        for key, _ in selector.select(0 if stopping else flush_interval):
+            sock = key.fileobj
+            # Con tráfico continuo el socket nunca se vacía: se corta al llenar
+            # un lote o al vencer flush_interval para no retener los datos
+            while len(statuses) + len(updates) + len(configs) < batch_size and \
+                    time.monotonic() - last_flush < flush_interval:
+                try:
+                    size, ancdata, _, addr = sock.recvmsg_into([buffer], ancbufsize)
+                except (BlockingIOError, InterruptedError):
+                    break
+                # Un broadcast llega a todos los sockets del grupo: cada trabajador
+                # atiende solo los orígenes que le tocan. El unicast ya lo reparte el núcleo.
+                if count > 1 and _is_broadcast(ancdata) and \
+                        int.from_bytes(socket.inet_aton(addr[0]), 'big') % count != index:
+                    continue
+                received += 1
+                try:
+                    payload = json.loads(buffer[:size])
+                except ValueError:
+                    errors += 1
+                    continue
+                if not isinstance(payload, dict):
+                    errors += 1
+                    continue
+                if key.data == CONFIG:
+                    configs.append((payload, addr))
+                    continue
+                # Solo los campos conocidos; varios paquetes de una IP se fusionan
+                compact = {k: v for k, v in payload.items() if k in STATUS_FIELDS}
+                if not coalesce:
+                    updates.append((addr[0], compact))
+                    continue
+                merged = statuses.get(addr[0])
+                if merged is None:
+                    statuses[addr[0]] = compact
+                else:
+                    merged.update(compact)
+        now = time.monotonic()
+        if stopping or len(statuses) + len(updates) + len(configs) >= batch_size \
+                or now - last_flush >= flush_interval:
+            # El plazo se reinicia aunque no haya nada que enviar
+            if received:
+                conn.send((list(statuses.items()) + updates, configs, errors, received))
+                statuses, updates, configs, errors, received = {}, [], [], 0, 0
+            last_flush = now
+    for key in list(selector.get_map().values()):
+        key.fileobj.close()
+    conn.close()
+
+
+class ShardedListener(UDPListener):
+    """``UDPListener`` con la recepción y el decodificado en ``workers`` procesos.
+
+    Los callbacks se llaman desde un hilo del proceso principal, igual que en
+    ``UDPListener``. Con ``coalesce`` los estados de cada IP llegan ya
+    fusionados por lote; sin él, uno por paquete. ``received`` cuenta los
+    datagramas que atiende algún trabajador, una vez cada uno. Si un
+    trabajador muere antes de ``stop()`` se avisa por ``on_error`` y se
+    arranca otro en su lugar.
+    """
+
+    def __init__(self, *args, workers: int = 2, batch_size: int = 256,
+                 flush_interval: float = 0.05, coalesce: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.coalesce = coalesce
+        self._processes = []
+        self._connections = []
+        self._stop_event = None
+
+    def start(self):
+        """Arranca los trabajadores y el hilo que recoge sus lotes."""
+        if not SHARDING_SUPPORTED:
+            raise RuntimeError("Sharded ingest requires Linux SO_REUSEPORT")
+        self._stop_event = multiprocessing.get_context().Event()
+        for index in range(self.workers):
+            process, receiver = self._spawn(index)
+            self._processes.append(process)
+            self._connections.append(receiver)
+        # Esperar a que todos tengan los sockets abiertos para no perder paquetes
+        try:
+            for receiver in self._connections:
+                self.buffer_sizes.update(receiver.recv())
+        except EOFError:
+            self.stop()
+            raise RuntimeError("An ingest worker failed to open its sockets") from None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        if self._stop_event:
+            self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        # El hilo termina solo al leer el último lote y el cierre de cada
+        # tubería; _running únicamente lo corta si algún trabajador no respondió
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._running = False
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        self._processes = []
+
+    def _spawn(self, index: int):
+        """Arranca el trabajador ``index``; devuelve el proceso y su tubería."""
+        context = multiprocessing.get_context()
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=_worker, daemon=True,
+            args=(index, self.workers, self.host, (self.status_port, self.config_port),
+                  sender, self._stop_event, self.batch_size, self.flush_interval,
+                  self.rcvbuf, self.coalesce))
+        process.start()
+        sender.close()
+        return process, receiver
+
+    def _respawn(self, conn):
+        """Sustituye al trabajador cuya tubería se ha cerrado antes de ``stop()``.
+
+        Devuelve la tubería del nuevo proceso, o None si tampoco consigue
+        abrir los sockets.
+        """
+        index = self._connections.index(conn)
+        self._processes[index].join(0)
+        self._report(f"Listener error: ingest worker {index} exited "
+                     f"(code {self._processes[index].exitcode}), restarting it")
+        process, receiver = self._spawn(index)
+        self._processes[index] = process
+        self._connections[index] = receiver
+        conn.close()
+        try:
+            receiver.recv()
+        except EOFError:
+            self._report(f"Listener error: ingest worker {index} failed to restart")
+            return None
+        return receiver
+
+    def _run(self):
+        connections = list(self._connections)
+        try:
+            while connections and self._running:
+                for conn in wait(connections, timeout=0.5):
+                    try:
+                        statuses, configs, errors, received = conn.recv()
+                    except EOFError:
+                        connections.remove(conn)
+                        # Un trabajador caído no puede dejar de atender su parte
+                        if not self._stop_event.is_set():
+                            receiver = self._respawn(conn)
+                            if receiver is not None:
+                                connections.append(receiver)
+                        continue
+                    self.received += received
+                    self._dispatch(statuses, configs, errors)
+        finally:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+    def _dispatch(self, statuses, configs, errors: int):
+        if errors:
+            self._report(f"Listener error: {errors} invalid packets")
+        for config, addr in configs:
+            try:
+                if self._source_allowed(addr[0]):
+                    self.on_config(config, addr)
+            except Exception as e:
+                self._report(f"Listener error: {str(e)}")
+        for ip, status in statuses:
+            try:
+                if not self._source_allowed(ip):
+                    self.filtered += 1
+                    continue
+                self.on_status(ip, status)
+            except Exception as e:
+                self._report(f"Listener error: {str(e)}")
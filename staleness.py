@@ -0,0 +1,73 @@
+import math
+import threading
+import time
+from typing import List, Optional, Set
+
+# Intervalo (segundos) con el que los dispositivos envían su estado
+BROADCAST_INTERVAL = 10.0
+
+
+class StalenessSweeper:
+    """Marca como offline los dispositivos que dejan de enviar estado.
+
+    Usa una rueda de temporización: cada dispositivo ocupa un hueco según el
+    instante en que caduca y ``sweep()`` solo revisa los huecos cuyo tiempo ha
+    pasado, sin recorrer toda la flota. Los paquetes no mueven al dispositivo
+    de hueco; al vencer, se comprueba su ``last_seen`` y, si ha llegado algo
+    entretanto, se reprograma. Así el coste por paquete y por dispositivo es
+    O(1) amortizado.
+    """
+
+    def __init__(self, registry, interval: float = BROADCAST_INTERVAL, missed: int = 3,
+                 tick: float = 1.0, now: Optional[float] = None):
+        self.registry = registry
+        self.timeout = interval * missed
+        self.tick = tick
+        # Con más huecos que ticks tiene el timeout, un plazo nunca da la vuelta
+        self._slots: List[Set[str]] = [set() for _ in range(math.ceil(self.timeout / tick) + 2)]
+        self._scheduled: Set[str] = set()
+        self._tick = self._tick_of(now if now is not None else time.monotonic())
+        self._lock = threading.Lock()
+
+    def seen(self, ip: str):
+        """Registra que ``ip`` está activo (tras un ``upsert``)."""
+        with self._lock:
+            if ip not in self._scheduled:
+                device = self.registry.get(ip)
+                if device is not None:
+                    self._schedule(ip, device.last_seen + self.timeout)
+
+    def sweep(self, now: Optional[float] = None) -> List[int]:
+        """Avanza la rueda hasta ``now`` y devuelve las filas que pasan a offline."""
+        now = now if now is not None else time.monotonic()
+        expired = []
+        with self._lock:
+            target = self._tick_of(now)
+            steps = min(target - self._tick, len(self._slots))
+            due = []
+            for step in range(1, steps + 1):
+                slot = self._slots[(self._tick + step) % len(self._slots)]
+                due.extend(slot)
+                slot.clear()
+            self._tick = target
+            for ip in due:
+                self._scheduled.discard(ip)
+                device = self.registry.get(ip)
+                if device is None or not device.is_online:
+                    continue
+                deadline = device.last_seen + self.timeout
+                if deadline <= now:
+                    row = self.registry.mark_offline(ip)
+                    if row is not None:
+                        expired.append(row)
+                else:
+                    self._schedule(ip, deadline)
+        return expired
+
+    def _schedule(self, ip: str, deadline: float):
+        tick = max(self._tick_of(deadline) + 1, self._tick + 1)
+        self._slots[tick % len(self._slots)].add(ip)
+        self._scheduled.add(ip)
+
+    def _tick_of(self, t: float) -> int:
+        return int(t // self.tick)
@@ -0,0 +1,203 @@
+import socket
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger('tcp_sessions')
+
+
+class TCPSession:
+    """Conexión TCP persistente con un dispositivo.
+
+    Se conecta bajo demanda, activa keepalive y, si la conexión cae, reconecta
+    con espera exponencial. Un lock garantiza que cada respuesta se empareja
+    con la petición que la originó: antes de cada envío se descarta lo que
+    quede en el socket y, si una petición vence sin respuesta, la conexión se
+    cierra para que una respuesta tardía no se lea como la de la siguiente.
+    Una conexión que el dispositivo ya ha cerrado, o que lleva más de
+    ``max_idle`` segundos sin usarse, se abre de nuevo antes de enviar.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 1.0,
+                 min_backoff: float = 0.5, max_backoff: float = 30.0,
+                 max_idle: float = 30.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.last_used = time.monotonic()
+        self._sock: Optional[socket.socket] = None
+        self._buffer = b""
+        self._lock = threading.Lock()
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def send(self, command: str):
+        """Envía un comando sin esperar respuesta."""
+        with self._lock:
+            self._call(lambda: self._send(command))
+
+    def request(self, command: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Envía un comando y devuelve la línea de respuesta (o None si no llega)."""
+        def exchange():
+            self._send(command)
+            response = self._read_line(timeout if timeout is not None else self.timeout)
+            if response is None:
+                self._disconnect()  # La respuesta puede llegar aún
+            return response
+
+        with self._lock:
+            return self._call(exchange)
+
+    def read_line(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Lee la siguiente línea de la conexión abierta (None si no llega)."""
+        with self._lock:
+            if self._sock is None:
+                return None
+            self.last_used = time.monotonic()
+            try:
+                return self._read_line(timeout if timeout is not None else self.timeout)
+            except OSError:
+                self._disconnect()
+                raise
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    def _call(self, operation):
+        """Ejecuta ``operation`` reintentando una vez si la conexión estaba rota."""
+        now = time.monotonic()
+        if self._sock is not None and (now - self.last_used > self.max_idle
+                                       or not self._drain()):
+            self._disconnect()
+        self.last_used = now
+        for attempt in range(2):
+            self._connect()
+            try:
+                return operation()
+            except OSError as e:
+                logger.debug("Session %s:%d failed: %s", self.host, self.port, e)
+                self._disconnect()
+                if attempt:
+                    raise
+
+    def _connect(self):
+        if self._sock is not None:
+            return
+        now = time.monotonic()
+        if now < self._retry_at:
+            raise ConnectionError(
+                f"{self.host}:{self.port} unreachable, retrying in {self._retry_at - now:.1f}s")
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        except OSError:
+            self._backoff = min(self.max_backoff, max(self.min_backoff, self._backoff * 2))
+            self._retry_at = time.monotonic() + self._backoff
+            raise
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for option, value in (('TCP_KEEPIDLE', 30), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3)):
+            if hasattr(socket, option):
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+        self._sock = sock
+        self._buffer = b""
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._buffer = b""
+
+    def _drain(self) -> bool:
+        """Descarta lo pendiente en el socket; False si el dispositivo lo ha cerrado."""
+        self._buffer = b""
+        try:
+            self._sock.setblocking(False)
+            while True:
+                if not self._sock.recv(4096):
+                    return False
+        except (BlockingIOError, InterruptedError):
+            return True
+        except OSError:
+            return False
+
+    def _send(self, command: str):
+        # La lectura anterior pudo dejar un timeout más corto en el socket
+        self._sock.settimeout(self.timeout)
+        self._sock.sendall(f"{command}\n".encode())
+
+    def _read_line(self, timeout: float) -> Optional[str]:
+        deadline = time.monotonic() + timeout
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._sock.settimeout(remaining)
+            try:
+                chunk = self._sock.recv(1024)
+            except socket.timeout:
+                break
+            if not chunk:
+                raise ConnectionResetError("connection closed by device")
+            self._buffer += chunk
+        if not self._buffer:
+            return None
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line.decode(errors='replace').strip()
+
+
+class SessionPool:
+    """Reparte una sesión TCP persistente por dispositivo y cierra las inactivas."""
+
+    def __init__(self, idle_timeout: float = 300.0, timeout: float = 1.0):
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._sessions: Dict[Tuple[str, int], TCPSession] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, host: str, port: int) -> TCPSession:
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get((host, port))
+            if session is None:
+                session = TCPSession(host, port, self.timeout)
+                self._sessions[(host, port)] = session
+            return session
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for key, session in list(self._sessions.items()):
+            if session.last_used < cutoff:
+                # Una sesión ocupada no se cierra; se revisará en la próxima llamada
+                if session._lock.acquire(blocking=False):
+                    try:
+                        session._disconnect()
+                    finally:
+                        session._lock.release()
+                    del self._sessions[key]
+
+
+# Pool compartido por todas las instancias de NMDevice
+DEFAULT_POOL = SessionPool()
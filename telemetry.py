@@ -0,0 +1,191 @@
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+
+# Métricas guardadas en el histórico, en este orden
+METRICS = ('hash_rate_hs', 'temp', 'rssi', 'free_heap')
+
+
+class RingBuffer:
+    """Buffer circular de tamaño fijo de filas ``(tiempo, valores...)``."""
+
+    def __init__(self, capacity: int, width: int):
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros((capacity, width), dtype=np.float32)
+        self.capacity = capacity
+        self.head = 0  # Próxima posición a escribir
+        self.count = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.times.nbytes + self.values.nbytes
+
+    def append(self, t: float, values):
+        self.times[self.head] = t
+        self.values[self.head] = values
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def oldest(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return float(self.times[(self.head - self.count) % self.capacity])
+
+    def newest(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return float(self.times[(self.head - 1) % self.capacity])
+
+    def window(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Devuelve, en orden cronológico, las filas con ``start <= t <= end``."""
+        if self.count < self.capacity:
+            times = self.times[:self.count]
+            values = self.values[:self.count]
+        else:
+            times = np.roll(self.times, -self.head)
+            values = np.roll(self.values, -self.head, axis=0)
+        lo = np.searchsorted(times, start, side='left')
+        hi = np.searchsorted(times, end, side='right')
+        return times[lo:hi], values[lo:hi]
+
+
+class DownsampledTier:
+    """Nivel de resumen con min/avg/max por intervalo de ``bucket`` segundos."""
+
+    def __init__(self, bucket: float, capacity: int, width: int):
+        self.bucket = bucket
+        self.width = width
+        # Cada fila guarda min, avg y max de todas las métricas seguidos
+        self.ring = RingBuffer(capacity, width * 3)
+        self._start = None
+        self._min = np.zeros(width, dtype=np.float64)
+        self._max = np.zeros(width, dtype=np.float64)
+        self._sum = np.zeros(width, dtype=np.float64)
+        self._count = 0
+
+    def add(self, t: float, values: np.ndarray):
+        start = t - (t % self.bucket)
+        if self._start is not None and start != self._start:
+            self._close()
+        if self._count == 0:
+            self._start = start
+            self._min[:] = values
+            self._max[:] = values
+            self._sum[:] = values
+        else:
+            np.minimum(self._min, values, out=self._min)
+            np.maximum(self._max, values, out=self._max)
+            self._sum += values
+        self._count += 1
+
+    def window(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Como ``RingBuffer.window``, incluyendo el intervalo aún abierto."""
+        times, values = self.ring.window(start, end)
+        if self._count and start <= self._start <= end:
+            times = np.append(times, self._start)
+            values = np.vstack((values, self._current()))
+        return times, values
+
+    def _current(self) -> np.ndarray:
+        return np.concatenate((self._min, self._sum / self._count, self._max))
+
+    def _close(self):
+        if self._count:
+            self.ring.append(self._start, self._current())
+        self._count = 0
+
+
+class DeviceHistory:
+    """Histórico de un dispositivo: muestras en bruto más resúmenes por minuto y hora."""
+
+    def __init__(self, raw_capacity: int, minute_capacity: int, hour_capacity: int):
+        width = len(METRICS)
+        self.raw = RingBuffer(raw_capacity, width)
+        self.tiers = {
+            'minute': DownsampledTier(60, minute_capacity, width),
+            'hour': DownsampledTier(3600, hour_capacity, width),
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return self.raw.nbytes + sum(tier.ring.nbytes for tier in self.tiers.values())
+
+    def add(self, t: float, values: np.ndarray):
+        # Las consultas buscan por tiempo y necesitan instantes ordenados: si el
+        # reloj de pared retrocede, la muestra se fecha con el último instante
+        newest = self.raw.newest()
+        if newest is not None and t < newest:
+            t = newest
+        self.raw.append(t, values)
+        for tier in self.tiers.values():
+            tier.add(t, values)
+
+
+class TelemetryHistory:
+    """Histórico de telemetría de toda la flota con memoria fija por dispositivo.
+
+    Por defecto guarda una hora de muestras en bruto (a ~5 s), un día de
+    resúmenes por minuto y dos semanas de resúmenes por hora.
+    """
+
+    def __init__(self, raw_capacity: int = 720, minute_capacity: int = 1440,
+                 hour_capacity: int = 336):
+        self.raw_capacity = raw_capacity
+        self.minute_capacity = minute_capacity
+        self.hour_capacity = hour_capacity
+        self._lock = threading.Lock()
+        self._devices: Dict[str, DeviceHistory] = {}
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self._devices
+
+    @property
+    def nbytes(self) -> int:
+        return sum(history.nbytes for history in self._devices.values())
+
+    def record(self, ip: str, t: float, values: Sequence[float]):
+        """Añade una muestra con los valores de ``METRICS`` en ese orden."""
+        with self._lock:
+            history = self._devices.get(ip)
+            if history is None:
+                history = DeviceHistory(self.raw_capacity, self.minute_capacity,
+                                        self.hour_capacity)
+                self._devices[ip] = history
+            history.add(t, np.asarray(values, dtype=np.float64))
+
+    def query(self, ip: str, metric: str, start: float, end: float,
+              resolution: str = 'auto') -> Dict[str, np.ndarray]:
+        """Devuelve la serie de ``metric`` entre ``start`` y ``end``.
+
+        ``resolution`` puede ser ``'raw'``, ``'minute'``, ``'hour'`` o ``'auto'``,
+        que elige el nivel más fino que cubre todo el intervalo. Las series en
+        bruto devuelven ``time`` y ``value``; las resumidas ``time``, ``min``,
+        ``avg`` y ``max``, incluido el intervalo en curso.
+        """
+        column = METRICS.index(metric)
+        with self._lock:
+            history = self._devices.get(ip)
+            if history is None:
+                return {'time': np.empty(0), 'value': np.empty(0)}
+            if resolution == 'auto':
+                resolution = self._pick_resolution(history, start)
+            if resolution == 'raw':
+                times, values = history.raw.window(start, end)
+                return {'time': times.copy(), 'value': values[:, column].copy()}
+            tier = history.tiers[resolution]
+            times, values = tier.window(start, end)
+            width = tier.width
+            return {
+                'time': times.copy(),
+                'min': values[:, column].copy(),
+                'avg': values[:, width + column].copy(),
+                'max': values[:, 2 * width + column].copy(),
+            }
+
+    @staticmethod
+    def _pick_resolution(history: DeviceHistory, start: float) -> str:
+        for name, ring in (('raw', history.raw), ('minute', history.tiers['minute'].ring)):
+            oldest = ring.oldest()
+            if ring.count < ring.capacity or (oldest is not None and oldest <= start):
+                return name
+        return 'hour'
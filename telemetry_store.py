@@ -0,0 +1,178 @@
+import os
+import json
+import queue
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger('telemetry_store')
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser('~'), '.nmcontroller', 'telemetry.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS status_samples (
+    ip TEXT NOT NULL,
+    t REAL NOT NULL,
+    hash_rate REAL,
+    temp REAL,
+    rssi REAL,
+    free_heap REAL,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS status_samples_ip_t ON status_samples (ip, t);
+CREATE INDEX IF NOT EXISTS status_samples_t ON status_samples (t);
+CREATE TABLE IF NOT EXISTS config_snapshots (
+    ip TEXT NOT NULL,
+    t REAL NOT NULL,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS config_snapshots_ip_t ON config_snapshots (ip, t);
+CREATE INDEX IF NOT EXISTS config_snapshots_t ON config_snapshots (t);
+"""
+
+
+class TelemetryStore:
+    """Persistencia de estados y configuraciones en SQLite (modo WAL).
+
+    Las escrituras se encolan en una cola acotada y un hilo propio las vuelca en
+    lotes, una transacción por lote, así que ni la ingesta ni la interfaz tocan
+    el disco. Si la cola se llena, las muestras nuevas se descartan y se cuentan
+    en ``dropped``.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, queue_size: int = 10000,
+                 batch_size: int = 500, flush_interval: float = 1.0,
+                 retention_days: float = 30.0, compact_interval: float = 3600.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.compact_interval = compact_interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """Crea la base de datos si hace falta y arranca el hilo escritor."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Vuelca lo pendiente y detiene el hilo escritor."""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def add_status(self, ip: str, t: float, values: Sequence[float], payload: dict):
+        """Encola una muestra de estado con hash rate, temp, RSSI y free heap ya parseados."""
+        self._put(('status', (ip, t, *(float(v) for v in values), json.dumps(payload))))
+
+    def add_config(self, ip: str, t: float, config: dict):
+        """Encola una copia de la configuración recibida de un dispositivo."""
+        self._put(('config', (ip, t, json.dumps(config))))
+
+    def query_status(self, ip: str, start: float, end: float) -> List[Tuple]:
+        """Devuelve ``(t, hash_rate, temp, rssi, free_heap, payload)`` en el intervalo."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT t, hash_rate, temp, rssi, free_heap, payload FROM status_samples "
+                "WHERE ip = ? AND t BETWEEN ? AND ? ORDER BY t", (ip, start, end)).fetchall()
+        return [(t, hr, temp, rssi, heap, json.loads(payload))
+                for t, hr, temp, rssi, heap, payload in rows]
+
+    def query_configs(self, ip: str, start: float, end: float) -> List[Tuple[float, dict]]:
+        """Devuelve ``(t, config)`` para las configuraciones guardadas en el intervalo."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT t, payload FROM config_snapshots "
+                "WHERE ip = ? AND t BETWEEN ? AND ? ORDER BY t", (ip, start, end)).fetchall()
+        return [(t, json.loads(payload)) for t, payload in rows]
+
+    def latest_config(self, ip: str) -> Optional[dict]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT payload FROM config_snapshots WHERE ip = ? ORDER BY t DESC LIMIT 1",
+                (ip,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def compact(self, conn: Optional[sqlite3.Connection] = None):
+        """Borra los datos más antiguos que ``retention_days`` y recorta el WAL."""
+        own = conn is None
+        if own:
+            conn = self._connect()
+        try:
+            cutoff = time.time() - self.retention_days * 86400
+            with conn:
+                conn.execute("DELETE FROM status_samples WHERE t < ?", (cutoff,))
+                conn.execute("DELETE FROM config_snapshots WHERE t < ?", (cutoff,))
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            if own:
+                conn.close()
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        last_compact = time.monotonic()
+        try:
+            while self._running or not self._queue.empty():
+                try:
+                    batch = self._next_batch()
+                    if batch:
+                        self._write(conn, batch)
+                    if time.monotonic() - last_compact >= self.compact_interval:
+                        last_compact = time.monotonic()
+                        self.compact(conn)
+                except sqlite3.Error as e:
+                    logger.error("Telemetry store error: %s", e)
+        finally:
+            conn.close()
+
+    def _next_batch(self) -> list:
+        """Espera hasta ``flush_interval`` y devuelve hasta ``batch_size`` elementos."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, batch: list):
+        statuses = [row for kind, row in batch if kind == 'status']
+        configs = [row for kind, row in batch if kind == 'config']
+        with conn:
+            if statuses:
+                conn.executemany(
+                    "INSERT INTO status_samples (ip, t, hash_rate, temp, rssi, free_heap, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", statuses)
+            if configs:
+                conn.executemany(
+                    "INSERT INTO config_snapshots (ip, t, payload) VALUES (?, ?, ?)", configs)